@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+import argparse
+import glob
+import os
+import sys
+import time
+
+import convert_core
+import settings_profiles
+import stage_timing
+from conversion_cache import default_cache_dir
+from media_probe import default_index_file
+
+#this is batch_convert.py, the headless command line front end for convert_core
+#usage example: python3 batch_convert.py ~/clips/ "~/more/*.mov" -o ~/gifs -j 8
+
+
+class JobResult:
+
+    def __init__(self, input_path, output_file=None, error=None, seconds=0.0, timings=None):
+        self.input_path = input_path
+        self.output_file = output_file
+        self.error = error
+        self.seconds = seconds
+        self.timings = timings  # stage timing record of the job when settings.timing_log is set
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+def collect_inputs(patterns, recursive=False):
+    # Expands directories and glob patterns into a sorted list of supported input files (no duplicates)
+    found = []
+    for pattern in patterns:
+        pattern = os.path.expanduser(pattern)
+        if os.path.isdir(pattern):
+            if recursive:
+                candidates = [os.path.join(root, name) for root, _, names in os.walk(pattern) for name in names]
+            else:
+                candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern, recursive=recursive) or [pattern]
+
+        for candidate in candidates:
+            if os.path.isfile(candidate) and convert_core.is_supported_input(candidate):
+                found.append(os.path.abspath(candidate))
+            elif candidate == pattern and not os.path.exists(candidate):
+                print(f"Warning: {pattern} did not match any file.", file=sys.stderr)
+
+    return sorted(set(found))
+
+
+def job_output_file(input_path, output_path, settings):
+    # Absolute path of the file a job writes, None when the input can't be converted (it then fails as its own job)
+    try:
+        extension = convert_core.output_extension(input_path, settings)
+    except (ValueError, convert_core.UnsupportedFileError):
+        return None
+    return os.path.abspath(convert_core.output_file_for(input_path, output_path, extension))
+
+
+def output_clashes(jobs):
+    # {index: index of the earlier job} for every job that would write the same output file as an earlier one,
+    # e.g. x/clip.mp4 and y/clip.mov of a recursive scan both becoming clip.gif
+    owners = {}
+    clashes = {}
+    for index, job in enumerate(jobs):
+        output_file = job_output_file(*job)
+        if output_file is None:
+            continue
+        if output_file in owners:
+            clashes[index] = owners[output_file]
+        else:
+            owners[output_file] = index
+    return clashes
+
+
+def print_progress(name, progress):
+    print(f"[{name}] {progress}", file=sys.stderr, flush=True)
+
+
+def convert_job(input_path, output_path, settings, show_progress=False):
+    # Runs inside a worker process, never raises so one bad file can't take the pool down
+    # (Ctrl+C still propagates, after convert_core has stopped the encoder and removed the partial output)
+    start = time.monotonic()
+    name = os.path.basename(input_path)
+    progress_callback = (lambda progress: print_progress(name, progress)) if show_progress else None
+    record = None
+    try:
+        with stage_timing.record_conversion(settings.timing_log, input_path) as record:
+            output_file = convert_core.convert_file(input_path, output_path, settings, progress_callback=progress_callback)
+            if record is not None:
+                record["output"] = output_file
+        return JobResult(input_path, output_file=output_file, seconds=time.monotonic() - start, timings=record)
+    except Exception as e:
+        return JobResult(input_path, error=str(e) or e.__class__.__name__, seconds=time.monotonic() - start, timings=record)
+
+
+def run_jobs(jobs, workers=None, on_result=None, show_progress=False):
+    # jobs are (input_path, output_path, settings) tuples, each with its own settings (see job_manifest.py);
+    # returns the JobResults in job order, on_result(index, result) is called as each job finishes
+    workers = workers or os.cpu_count() or 1
+    if not jobs:
+        return []
+    for _, output_path, _ in jobs:
+        os.makedirs(output_path, exist_ok=True)
+
+    # Jobs that would overwrite the output of an earlier job fail up front instead of racing it for the same file
+    results = {}
+    for index, earlier in output_clashes(jobs).items():
+        results[index] = JobResult(jobs[index][0], error=f"Error: {jobs[earlier][0]} already writes the same output file "
+                                                         f"{job_output_file(*jobs[index])}.")
+        if on_result is not None:
+            on_result(index, results[index])
+    runnable = [index for index in range(len(jobs)) if index not in results]
+
+    if len(runnable) <= 1 or workers == 1:
+        # Nothing to parallelize: skip the pool (and the ~30ms of importing it), which matters when a runner starts us per file
+        for index in runnable:
+            results[index] = convert_job(*jobs[index], show_progress)
+            if on_result is not None:
+                on_result(index, results[index])
+        return [results[index] for index in range(len(jobs))]
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=min(workers, len(runnable))) as pool:
+        futures = {pool.submit(convert_job, *jobs[index], show_progress): index for index in runnable}
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                results[futures[future]] = result
+                if on_result is not None:
+                    on_result(futures[future], result)
+        except KeyboardInterrupt:
+            # Don't let the idle workers pick up the queued jobs while the pool shuts down
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    return [results[index] for index in range(len(jobs))]
+
+
+def run_batch(inputs, output_path, settings, workers=None, on_result=None, show_progress=False):
+    # Converts every input across a pool of worker processes (default = CPU count) and returns the JobResults in input order
+    return run_jobs([(input_path, output_path, settings) for input_path in inputs], workers,
+                    on_result and (lambda index, result: on_result(result)), show_progress)
+
+
+def add_settings_arguments(parser):
+    # Output, worker and conversion settings options, shared with watch_folder.py and job_manifest.py.
+    # The conversion options default to None (= not given), so over a profile only the options actually typed count
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="number of worker processes (default: CPU count)")
+    parser.add_argument("--profile", help="start from this saved settings profile, the options given here change it")
+    parser.add_argument("--save-profile", metavar="NAME", help="save the resulting settings as a profile (e.g. to replay a run)")
+    parser.add_argument("-f", "--format", choices=convert_core.SUPPORTED_OUTPUT_FORMATS, help="output format for GIF inputs (default: mp4)")
+    parser.add_argument("--gif-fps", type=int, help="FPS for every video to GIF conversion")
+    parser.add_argument("--video-fps", type=int, help="FPS for GIF to video conversions with --cfr or an AVI output")
+    parser.add_argument("--bitrate", type=int, help="bitrate in kbps for GIF to video conversions")
+    parser.add_argument("--gif-encoder", choices=convert_core.GIF_ENCODERS,
+                        help="ffmpeg = palettegen and paletteuse passes (default), moviepy = frame piping through Python")
+    parser.add_argument("--video-encoder", choices=convert_core.VIDEO_ENCODERS,
+                        help="ffmpeg = GIF streamed through one process (default), moviepy = frame piping through Python")
+    parser.add_argument("--preset", choices=convert_core.ENCODER_PRESETS,
+                        help="speed/quality of the video encoders, x264 preset or vp9 deadline/cpu-used (default: fast)")
+    parser.add_argument("--tune", choices=convert_core.X264_TUNES, help="x264 tune for mp4/mov/avi outputs (e.g. animation)")
+    parser.add_argument("--crf", type=int, help="constant quality instead of --bitrate, lower is better (x264 ~18-28, vp9 ~24-40)")
+    parser.add_argument("--threads", type=int,
+                        help="threads per video encoder, 0 = automatic (default, vp9: CPU count, row-mt and tile columns)")
+    parser.add_argument("--cfr", action=argparse.BooleanOptionalAction,
+                        help="resample GIFs to --video-fps instead of keeping their own frame delays")
+    parser.add_argument("--keep-duplicates", action=argparse.BooleanOptionalAction,
+                        help="keep repeated GIF frames instead of dropping them")
+    parser.add_argument("--max-width", type=int, help="scale GIFs down to this width, 0 = no limit (default: 1080)")
+    parser.add_argument("--max-height", type=int, help="scale GIFs down to this height, 0 = no limit (default)")
+    parser.add_argument("--upscale", action=argparse.BooleanOptionalAction,
+                        help="also scale smaller sources up to --max-width/--max-height")
+    parser.add_argument("--scaler", choices=convert_core.SCALERS, help="ffmpeg scaler for GIFs (default: lanczos)")
+    parser.add_argument("--max-size-mb", type=float,
+                        help="size budget per GIF in MB: a few short samples are trial encoded to pick the frame size, fps and "
+                             "colour count for a single full encode that fits")
+    parser.add_argument("--start", help="only convert from this time on (seconds or [hh:]mm:ss)")
+    parser.add_argument("--end", help="stop converting at this time (seconds or [hh:]mm:ss)")
+    parser.add_argument("--segment", action="append", metavar="START-END",
+                        help="convert this range, repeat to join several ranges into one output (overrides --start/--end)")
+    parser.add_argument("--chunked", action=argparse.BooleanOptionalAction,
+                        help="encode long inputs as time chunks in parallel ffmpeg processes (best with -j 1, the chunks use the cores)")
+    parser.add_argument("--chunks", type=int, help="number of chunks for --chunked, 0 = from duration and CPU count (default)")
+    parser.add_argument("--timings", metavar="FILE",
+                        help="append per-stage timings of every conversion to this JSON-lines file (summary: stage_timing.py FILE)")
+    parser.add_argument("--progress", action="store_true", help="print frame level progress of every job to stderr")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="conversion cache folder (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="always convert and probe, never read or write the cache or the probe index")
+    parser.add_argument("--cache-size", type=int, default=2048, help="cache size cap in MB (default: %(default)s)")
+    parser.add_argument("--content-hash", action="store_true", help="key the cache on the input content instead of path+size+mtime")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Batch video <-> gif conversion without the GUI.")
+    parser.add_argument("inputs", nargs="*", help="input files, directories or glob patterns")
+    parser.add_argument("-r", "--recursive", action="store_true", help="descend into sub directories / allow ** in globs")
+    add_settings_arguments(parser)
+    return parser
+
+
+def parse_segment(text):
+    start, separator, end = text.partition("-")
+    if not separator:
+        raise argparse.ArgumentTypeError(f"segment '{text}' is not START-END")
+    return convert_core.parse_time(start), convert_core.parse_time(end) if end else None
+
+
+def settings_from_args(args, base=None):
+    # With --profile (or a base from a job manifest) that is the starting point and only the options given on the
+    # command line change it; without one it is ConversionSettings(), whose defaults the help texts name
+    if base is None and args.profile:
+        base = settings_profiles.load_profile(args.profile)
+    settings = base or convert_core.ConversionSettings()
+
+    def given(name):
+        return getattr(args, name) is not None
+
+    if given("format"):
+        settings.selected_format = args.format
+    if given("gif_encoder"):
+        settings.gif_encoder = args.gif_encoder
+    if given("video_encoder"):
+        settings.video_encoder = args.video_encoder
+    if given("cfr"):
+        settings.gif_vfr = not args.cfr
+    if given("preset"):
+        settings.encoder_preset = args.preset
+    if given("tune"):
+        settings.x264_tune = args.tune
+    if given("crf"):
+        settings.crf = args.crf
+    if given("threads"):
+        settings.video_threads = args.threads
+    if given("keep_duplicates"):
+        settings.dedupe_frames = not args.keep_duplicates
+    if given("max_width"):
+        settings.max_width = args.max_width or None
+    if given("max_height"):
+        settings.max_height = args.max_height or None
+    if given("upscale"):
+        settings.allow_upscale = args.upscale
+    if given("scaler"):
+        settings.scaler = args.scaler
+    if given("max_size_mb"):
+        settings.max_output_mb = args.max_size_mb
+    if given("chunked"):
+        settings.chunked = args.chunked
+    if given("chunks"):
+        settings.chunks = args.chunks
+    if args.start:
+        settings.start_time = convert_core.parse_time(args.start)
+    if args.end:
+        settings.end_time = convert_core.parse_time(args.end)
+    if args.segment:
+        settings.segments = [parse_segment(segment) for segment in args.segment]
+    if args.bitrate:
+        settings.bitrate = args.bitrate
+    if args.gif_fps:
+        settings.mp4_to_gif_fps = settings.webm_to_gif_fps = settings.mov_to_gif_fps = settings.avi_to_gif_fps = args.gif_fps
+    if args.video_fps:
+        settings.gif_to_mp4_fps = settings.gif_to_webm_fps = settings.gif_to_mov_fps = settings.gif_to_avi_fps = args.video_fps
+
+    # Machine specific, never part of a profile
+    settings.cache_dir = None if args.no_cache else os.path.expanduser(args.cache_dir)
+    settings.media_index = None if args.no_cache else default_index_file()
+    settings.cache_max_mb = args.cache_size
+    settings.cache_content_hash = args.content_hash
+    settings.timing_log = args.timings and os.path.expanduser(args.timings)
+    return settings
+
+
+def print_result(result):
+    name = os.path.basename(result.input_path)
+    if result.ok:
+        print(f"[ok]     {name} -> {result.output_file} ({result.seconds:.1f}s)", flush=True)
+    else:
+        print(f"[failed] {name}: {result.error} ({result.seconds:.1f}s)", flush=True)
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        settings = settings_from_args(args)
+        convert_core.selected_ranges(settings)
+        if args.save_profile:
+            print(f"Profile saved to {settings_profiles.save_profile(args.save_profile, settings)}")
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+    if not args.inputs and args.save_profile:
+        return 0
+
+    inputs = collect_inputs(args.inputs, recursive=args.recursive)
+    if not inputs:
+        print("Error: no supported input files found.", file=sys.stderr)
+        return 2
+
+    start = time.monotonic()
+    try:
+        results = run_batch(inputs, os.path.expanduser(args.output), settings, workers=args.jobs,
+                            on_result=print_result, show_progress=args.progress)
+    except KeyboardInterrupt:
+        # The workers got the same SIGINT and clean up their own encoders and partial outputs
+        print("Cancelled.", file=sys.stderr)
+        return 130
+    failed = [result for result in results if not result.ok]
+
+    if settings.timing_log:
+        for line in stage_timing.summarize([result.timings for result in results if result.timings]):
+            print(line)
+    print(f"{len(results) - len(failed)}/{len(results)} converted in {time.monotonic() - start:.1f}s, {len(failed)} failed.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ffmpeg_runner import ffmpeg_binary
+
+#this is benchmark.py, it synthesizes test clips with ffmpeg and times every conversion path on them
+#usage example: python3 benchmark.py -o bench.json            (full matrix)
+#               python3 benchmark.py --quick --compare old.json (small matrix, compared against an earlier run)
+#               python3 benchmark.py --startup           (start up time of the headless entry points against the budget)
+#every case runs in a fresh child process so wall time, CPU time (including ffmpeg) and peak RSS belong to that case only
+#only ffmpeg is needed: convert_core imports MoviePy and PIL lazily, and the moviepy variants are skipped when MoviePy is missing
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# How each container gets synthesized, only encoders that a stock ffmpeg build ships
+SOURCE_ENCODERS = {
+    "mp4": ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"],
+    "mov": ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"],
+    "webm": ["-c:v", "libvpx", "-deadline", "realtime", "-cpu-used", "8", "-b:v", "2M"],
+    "avi": ["-c:v", "mpeg4", "-q:v", "5"],
+    "gif": ["-vf", "split[a][b];[a]palettegen[p];[b][p]paletteuse"],
+}
+
+# (container, width, height, seconds, fps)
+FULL_SOURCES = [(container, width, height, 5, 30) for container in ("mp4", "webm", "mov", "avi")
+                for width, height in ((640, 360), (1920, 1080))] + \
+               [("mp4", 1280, 720, 20, 60), ("gif", 320, 240, 3, 15), ("gif", 640, 360, 8, 25)]
+QUICK_SOURCES = [(container, 640, 360, 3, 30) for container in ("mp4", "webm", "mov", "avi")] + [("gif", 320, 240, 3, 15)]
+
+# Named setting variants, applied on top of ConversionSettings() for the matching kind of input
+GIF_VARIANTS = {
+    "ffmpeg": {"gif_encoder": "ffmpeg"},
+    "moviepy": {"gif_encoder": "moviepy"},
+}
+VIDEO_VARIANTS = {fmt: {"selected_format": fmt} for fmt in ("mp4", "webm", "mov", "avi")}
+VIDEO_VARIANTS.update({
+    "mp4-cfr": {"selected_format": "mp4", "gif_vfr": False},
+    "mp4-moviepy": {"selected_format": "mp4", "video_encoder": "moviepy"},
+    "mp4-quality": {"selected_format": "mp4", "encoder_preset": "quality"},
+    "webm-quality": {"selected_format": "webm", "encoder_preset": "quality"},
+})
+
+# Start up of the headless entry points, which a job runner that spawns us per file pays every time
+STARTUP_COMMANDS = {
+    "python": ["-c", "pass"],  # the interpreter alone, the floor of everything else
+    "import-core": ["-c", "import convert_core"],
+    "batch-help": ["batch_convert.py", "--help"],
+    "watch-help": ["watch_folder.py", "--help"],
+    "launcher-help": ["videogifconvert-2.py", "--help"],
+}
+STARTUP_BUDGET_S = 0.25  # median wall time allowed for each of them, python's own start included
+STARTUP_MIN_REPEAT = 5
+HEAVY_MODULES = ["moviepy", "PIL", "numpy", "imageio", "proglog", "tqdm", "gi"]  # must not load before a conversion needs them
+
+
+def source_id(source):
+    container, width, height, seconds, fps = source
+    return f"{width}x{height}_{seconds}s_{fps}fps.{container}"
+
+def synthesize(source, work_dir):
+    # testsrc2 has motion and colour gradients, closer to real footage than a flat colour
+    container, width, height, seconds, fps = source
+    path = os.path.join(work_dir, "sources", source_id(source))
+    if os.path.exists(path):
+        return path
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    subprocess.run([ffmpeg_binary(), "-hide_banner", "-loglevel", "error", "-y", "-f", "lavfi",
+                    "-i", f"testsrc2=size={width}x{height}:rate={fps}:duration={seconds}",
+                    *SOURCE_ENCODERS[container], path + ".part." + container], check=True)
+    os.replace(path + ".part." + container, path)
+    return path
+
+def uses_moviepy(overrides):
+    return "moviepy" in (overrides.get("gif_encoder"), overrides.get("video_encoder"))
+
+def build_cases(sources, variant_filter=None, skip_moviepy=False):
+    cases = []
+    for source in sources:
+        variants = VIDEO_VARIANTS if source[0] == "gif" else GIF_VARIANTS
+        for name, overrides in variants.items():
+            if (variant_filter and name not in variant_filter) or (skip_moviepy and uses_moviepy(overrides)):
+                continue
+            path = f"gif_to_{overrides['selected_format']}" if source[0] == "gif" else f"{source[0]}_to_gif"
+            cases.append({"id": f"{path}|{source_id(source)}|{name}", "path": path, "source": source, "settings": overrides})
+    return cases
+
+def expected_frames(case):
+    # Frames the conversion has to produce, for the throughput figure: gif -> video keeps the GIF's own frames by default,
+    # everything else runs at the default 30 fps settings
+    _, _, _, seconds, fps = case["source"]
+    if case["path"].startswith("gif_to_") and case["settings"].get("gif_vfr", True) and case["path"] != "gif_to_avi" \
+            and case["settings"].get("video_encoder", "ffmpeg") == "ffmpeg":
+        return seconds * fps
+    return seconds * 30
+
+def run_one(case_json):
+    # Child side: one conversion with the cache disabled, prints the output path as JSON
+    import convert_core
+
+    case = json.loads(case_json)
+    settings = convert_core.ConversionSettings()
+    for name, value in case["settings"].items():
+        setattr(settings, name, value)
+    settings.cache_dir = None
+    os.makedirs(case["output_dir"], exist_ok=True)
+    output_file = convert_core.convert_file(case["input"], case["output_dir"], settings)
+    print(json.dumps({"output": output_file}))
+
+def measure(case, input_path, output_dir):
+    # Parent side: runs the child and collects its rusage with wait4 (children of the child, i.e. ffmpeg, are included)
+    child_case = dict(case, input=input_path, output_dir=output_dir)
+    # Output goes to files rather than pipes: moviepy's progress bars could fill a pipe, and communicate() would reap the child
+    with tempfile.TemporaryFile("w+") as stdout_file, tempfile.TemporaryFile("w+") as stderr_file:
+        start = time.monotonic()
+        process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--run-one", json.dumps(child_case)],
+                                   stdout=stdout_file, stderr=stderr_file, text=True, cwd=HERE)
+        _, status, rusage = os.wait4(process.pid, 0)
+        wall = time.monotonic() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stdout_file.seek(0)
+        stderr_file.seek(0)
+        stdout, stderr = stdout_file.read(), stderr_file.read()
+
+    result = {"id": case["id"], "path": case["path"], "source": source_id(case["source"]), "settings": case["settings"],
+              "wall_s": round(wall, 4), "cpu_s": round(rusage.ru_utime + rusage.ru_stime, 4),
+              "peak_rss_mb": round(rusage.ru_maxrss / 1024, 1)}  # ru_maxrss is in KB on Linux
+    if process.returncode != 0:
+        result["error"] = (stderr.strip().splitlines() or ["exit code %d" % process.returncode])[-1]
+        return result
+
+    output_file = json.loads(stdout.strip().splitlines()[-1])["output"]
+    frames = expected_frames(case)
+    result.update(output_bytes=os.path.getsize(output_file), frames=frames, frames_per_s=round(frames / wall, 2))
+    return result
+
+def summarize(runs):
+    # Median of the repeats, the spread is kept so noisy cases can be spotted
+    if any("error" in run for run in runs):
+        return next(run for run in runs if "error" in run)
+    result = dict(runs[0])
+    for key in ("wall_s", "cpu_s", "peak_rss_mb", "frames_per_s"):
+        result[key] = round(statistics.median(run[key] for run in runs), 4)
+    result["wall_s_runs"] = [run["wall_s"] for run in runs]
+    return result
+
+def measure_startup(repeat):
+    results = []
+    for name, args in STARTUP_COMMANDS.items():
+        walls = []
+        for _ in range(repeat):
+            start = time.monotonic()
+            subprocess.run([sys.executable, *args], cwd=HERE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            walls.append(time.monotonic() - start)
+        results.append({"id": f"startup|{name}", "path": "startup", "wall_s": round(statistics.median(walls), 4),
+                        "wall_s_runs": [round(wall, 4) for wall in walls]})
+    return results
+
+def heavy_imports():
+    # Heavy modules that a headless start pulls in, should be none of them
+    code = "import sys, batch_convert, watch_folder; print(' '.join(sorted({name.split('.')[0] for name in sys.modules})))"
+    loaded = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True).stdout.split()
+    return [name for name in HEAVY_MODULES if name in loaded]
+
+def run_startup(args):
+    results = measure_startup(max(args.repeat, STARTUP_MIN_REPEAT))
+    over_budget = []
+    for result in results:
+        flag = ""
+        if result["id"] != "startup|python" and result["wall_s"] > args.startup_budget:
+            flag = f"  <-- over the {args.startup_budget:.2f}s budget"
+            over_budget.append(result["id"])
+        print(f"{result['id']:30} {result['wall_s'] * 1000:8.1f} ms{flag}", flush=True)
+    heavy = heavy_imports()
+    if heavy:
+        print(f"Headless start imports {', '.join(heavy)}", flush=True)
+    return results, bool(over_budget or heavy)
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ""
+    binary = ffmpeg_binary()
+    ffmpeg_version = subprocess.run([binary, "-version"], capture_output=True, text=True).stdout.splitlines()[0] if binary else None
+    return {"commit": commit or None, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+            "ffmpeg": ffmpeg_version}
+
+def compare(baseline_path, results, threshold):
+    # Prints wall time and output size ratios against an earlier results file, returns the ids that got slower
+    with open(baseline_path) as f:
+        baseline = {result["id"]: result for result in json.load(f)["results"]}
+    regressions = []
+    print(f"{'case':70} {'wall':>8} {'size':>8}")
+    for result in results:
+        before = baseline.get(result["id"])
+        if before is None or "error" in before or "error" in result:
+            continue
+        wall_ratio = result["wall_s"] / before["wall_s"] if before["wall_s"] else 1.0
+        size_ratio = result["output_bytes"] / before["output_bytes"] if before.get("output_bytes") else 1.0  # startup has none
+        flag = "  <-- slower" if wall_ratio > 1 + threshold else ""
+        print(f"{result['id']:70} {wall_ratio:7.2f}x {size_ratio:7.2f}x{flag}")
+        if flag:
+            regressions.append(result["id"])
+    return regressions
+
+def run_cases(args):
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="videogif-bench-")
+    skip_moviepy = importlib.util.find_spec("moviepy") is None
+    if skip_moviepy:
+        print("MoviePy is not installed, skipping the moviepy variants.", flush=True)
+    cases = build_cases(QUICK_SOURCES if args.quick else FULL_SOURCES, args.variant, skip_moviepy)
+    results = []
+    try:
+        for case in cases:
+            input_path = synthesize(case["source"], work_dir)
+            runs = []
+            for _ in range(args.repeat):
+                output_dir = tempfile.mkdtemp(dir=work_dir, prefix="out-")
+                runs.append(measure(case, input_path, output_dir))
+                shutil.rmtree(output_dir, ignore_errors=True)
+            result = summarize(runs)
+            results.append(result)
+            if "error" in result:
+                print(f"{case['id']:70} error: {result['error']}", flush=True)
+            else:
+                print(f"{case['id']:70} {result['wall_s']:7.2f}s cpu {result['cpu_s']:7.2f}s "
+                      f"rss {result['peak_rss_mb']:7.1f}MB {result['output_bytes'] / 1024:9.0f}KB {result['frames_per_s']:8.1f} fps",
+                      flush=True)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Benchmark every conversion path on synthesized clips.")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="results file (default: %(default)s)")
+    parser.add_argument("--quick", action="store_true", help="small matrix for a fast smoke run")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case, the median is reported")
+    parser.add_argument("--variant", action="append", help="only run these setting variants (e.g. ffmpeg, moviepy, webm)")
+    parser.add_argument("--work-dir", help="keeps the synthesized clips here between runs (default: a temporary folder)")
+    parser.add_argument("--compare", metavar="BASELINE", help="compare against an earlier results file")
+    parser.add_argument("--startup", action="store_true", help="measure the start up time of the headless entry points instead")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_S,
+                        help="seconds each entry point may take to start (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="wall time increase reported as a regression")
+    parser.add_argument("--run-one", help=argparse.SUPPRESS)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run_one:
+        run_one(args.run_one)
+        return 0
+    over_budget = False
+    if args.startup:
+        results, over_budget = run_startup(args)
+    elif ffmpeg_binary() is None:
+        print("Error: ffmpeg was not found.", file=sys.stderr)
+        return 2
+    else:
+        results = run_cases(args)
+
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    regressions = compare(args.compare, results, args.threshold) if args.compare else []
+    return 1 if regressions or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
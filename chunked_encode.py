@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ffmpeg_runner import CancelToken, ConversionCancelled, Progress, run_ffmpeg
+from stage_timing import Stage
+
+#this is chunked_encode.py, it splits one long conversion into time chunks that are encoded by parallel ffmpeg processes
+#and joined afterwards; convert_core builds the actual ffmpeg arguments for GIF and video outputs
+
+MIN_CHUNK_SECONDS = 20.0  # below this the extra process start and seek cost more than they save
+
+
+def plan_chunks(start, end, chunks=0, workers=None, frame_duration=None):
+    # Splits [start, end) into equal chunks, `chunks` = 0 picks the count from the duration and the CPU count.
+    # With frame_duration the cuts land on whole output frames, so the joined frame timing has no hiccup at a cut
+    duration = end - start
+    if chunks <= 0:
+        chunks = min(workers or os.cpu_count() or 1, int(duration // MIN_CHUNK_SECONDS))
+    if chunks < 2:
+        return [(start, end)]
+    step = duration / chunks
+    if frame_duration:
+        step = max(round(step / frame_duration), 1) * frame_duration
+    cuts = [start + index * step for index in range(1, chunks) if start + index * step < end]
+    bounds = [start, *cuts, end]
+    return list(zip(bounds, bounds[1:]))
+
+def concat_list(chunk_files, list_file):
+    # Input for ffmpeg's concat demuxer, single quotes in paths are escaped the way it expects
+    with open(list_file, "w") as f:
+        for chunk_file in chunk_files:
+            escaped = chunk_file.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    return list_file
+
+def encode_chunked(chunks, chunk_args, chunk_extension, join_args, output_file, total_frames=None,
+                   progress_callback=None, cancel_token=None):
+    # chunk_args(start, end, chunk_file) -> ffmpeg args for one chunk, join_args(list_file, output_file) -> args of the join
+    cancel_token = cancel_token or CancelToken()  # also used to stop the sibling chunks when one of them fails
+    work_dir = tempfile.mkdtemp(prefix="videogif-chunks-")
+    chunk_files = [os.path.join(work_dir, f"chunk{index:03d}{chunk_extension}") for index in range(len(chunks))]
+
+    frames_done = [0] * len(chunks)
+    lock = threading.Lock()
+    start_time = time.monotonic()
+
+    def report(index, progress):
+        with lock:
+            frames_done[index] = progress.frames_done
+            done = sum(frames_done)
+        if progress_callback is not None:
+            elapsed = time.monotonic() - start_time
+            progress_callback(Progress(done, total_frames, done / elapsed if elapsed > 0 else 0.0, elapsed))
+
+    def encode(index):
+        chunk_start, chunk_end = chunks[index]
+        try:
+            run_ffmpeg(chunk_args(chunk_start, chunk_end, chunk_files[index]),
+                       progress_callback=lambda progress: report(index, progress),
+                       cancel_token=cancel_token, partial_output=chunk_files[index])
+        except ConversionCancelled:
+            raise
+        except BaseException:
+            cancel_token.cancel()
+            raise
+
+    try:
+        # Threads are enough here, each one just babysits its own ffmpeg process
+        with Stage("encode_chunks"), ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+            futures = [pool.submit(encode, index) for index in range(len(chunks))]
+            errors = [future.exception() for future in futures]
+
+        # Report the chunk that actually failed rather than the siblings that were cancelled because of it
+        real_errors = [error for error in errors if error is not None and not isinstance(error, ConversionCancelled)]
+        if real_errors:
+            raise real_errors[0]
+        cancel_token.raise_if_cancelled()
+
+        list_file = concat_list(chunk_files, os.path.join(work_dir, "chunks.txt"))
+        with Stage("join", output=output_file):
+            run_ffmpeg(join_args(list_file, output_file), cancel_token=cancel_token, partial_output=output_file)
+        return output_file
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
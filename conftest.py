@@ -0,0 +1 @@
+#this is conftest.py, it only makes pytest put the repo folder on sys.path so tests/ can import the modules next to it
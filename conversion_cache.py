@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+try:
+    import fcntl
+except ImportError:  # not on Windows, hits are plain copies there
+    fcntl = None
+
+#this is conversion_cache.py, an on-disk cache of finished conversions so a repeat conversion is just a copy (or a clone)
+#entries are named <key><extension>, the key hashes the input fingerprint together with the settings that affect the output
+
+CACHE_FORMAT_VERSION = 4  # bump when an encoder change makes old entries wrong (3: hard linked hits, 4: exact mpdecimate)
+FICLONE = 0x40049409  # Linux ioctl, copy-on-write clone of a whole file (btrfs, xfs, bcachefs ...)
+
+
+def default_cache_dir():
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "videogifconvert", "conversions")
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+
+    def __init__(self, cache_dir=None, max_bytes=2 * 1024 ** 3, content_hash=False):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.content_hash = content_hash  # False = path+size+mtime fast path, True = hash the whole input file
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def input_fingerprint(self, input_path):
+        if self.content_hash:
+            return "sha256:" + file_sha256(input_path)
+        stat = os.stat(input_path)
+        return f"stat:{os.path.abspath(input_path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def key(self, input_path, options):
+        payload = json.dumps({"version": CACHE_FORMAT_VERSION, "input": self.input_fingerprint(input_path), "options": options},
+                             sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def entry_path(self, key, extension):
+        return os.path.join(self.cache_dir, key + extension)
+
+    def fetch(self, key, output_file):
+        # Places a cached result at output_file, returns False on a miss
+        entry = self.entry_path(key, os.path.splitext(output_file)[1])
+        if not os.path.isfile(entry):
+            return False
+        try:
+            os.utime(entry)  # mtime is the LRU clock
+            place_file(entry, output_file)
+        except FileNotFoundError:
+            return False  # evicted by another worker in the meantime
+        return True
+
+    def store(self, key, output_file):
+        if os.path.getsize(output_file) > self.max_bytes:
+            return  # would be evicted right away, together with every other entry (it is the newest)
+        entry = self.entry_path(key, os.path.splitext(output_file)[1])
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        os.close(fd)
+        try:
+            shutil.copyfile(output_file, temp_path)
+            os.replace(temp_path, entry)  # atomic, so parallel workers never see a half written entry
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        # Drops the least recently used entries until the cache fits in max_bytes again
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".part"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+def clone_file(source, destination):
+    # Copy-on-write clone, False when the platform or the file system can't do one
+    if fcntl is None:
+        return False
+    try:
+        with open(source, "rb") as source_file, open(destination, "wb") as destination_file:
+            fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+    except OSError:
+        return False
+    return True
+
+
+def place_file(source, destination):
+    # The output gets data of its own, never a hard link: anything writing to it in place later (a --no-cache run,
+    # an editor) would write through the link into the cache entry, which then gets served for the wrong settings
+    if os.path.lexists(destination):
+        os.remove(destination)
+    try:
+        if not clone_file(source, destination):
+            shutil.copyfile(source, destination)
+    except BaseException:
+        if os.path.lexists(destination):
+            os.remove(destination)
+        raise
@@ -0,0 +1,691 @@
+#!/usr/bin/env python3
+import contextlib
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from chunked_encode import encode_chunked, plan_chunks
+from conversion_cache import ConversionCache
+from ffmpeg_runner import Progress, ffmpeg_binary, remove_partial_output, run_ffmpeg
+from media_probe import detect_format, media_info
+from stage_timing import Stage, add_frames
+
+#this is convert_core.py, it holds the conversion functions without any GTK code so they can run on a headless box
+#converter_window.py (the GUI) and batch_convert.py (the CLI) both call into this module
+#MoviePy and PIL are only imported by the moviepy fallback (see moviepy_editor), so a headless start stays cheap
+
+SUPPORTED_VIDEO_FORMATS = [".mp4", ".webm", ".mov", ".avi"]
+SUPPORTED_GIF_FORMATS = [".gif"]
+SUPPORTED_OUTPUT_FORMATS = ["mp4", "webm", "mov", "avi"]
+GIF_ENCODERS = ["ffmpeg", "moviepy"]  # "ffmpeg" = palettegen + paletteuse subprocesses, "moviepy" = the old frame piping
+VIDEO_ENCODERS = ["ffmpeg", "moviepy"]  # "ffmpeg" = GIF streamed through one subprocess, "moviepy" = every frame as a numpy array
+VFR_FORMATS = ["mp4", "webm", "mov"]  # avi can only store a constant frame rate
+SCALERS = ["lanczos", "bicubic", "bilinear", "fast_bilinear", "area", "neighbor"]  # ffmpeg swscale flags, fastest last-ish
+GIF_BYTES_PER_PIXEL = 0.15  # rough size of one pixel of one frame after dithering, LZW and rectangle diffing
+                            # (only used by the moviepy fallback, the ffmpeg path measures samples instead)
+ENCODER_PRESETS = ["fast", "balanced", "quality"]  # speed/quality trade-off of the video encoders, "fast" is the default
+X264_PRESETS = {"fast": "veryfast", "balanced": "medium", "quality": "slow"}
+X264_TUNES = ["film", "animation", "grain", "stillimage"]
+VP9_SPEEDS = {"fast": ["-deadline", "realtime", "-cpu-used", "8"],  # libvpx-vp9's own speed knobs
+              "balanced": ["-deadline", "good", "-cpu-used", "4"],
+              "quality": ["-deadline", "good", "-cpu-used", "1"]}
+VP9_MIN_TILE_WIDTH = 256  # a VP9 tile column is at least this wide, so small frames get fewer of them
+VP9_MAX_THREADS = 8  # libvpx barely scales past this even with row-mt
+SIZE_SAMPLE_COUNT = 3  # short windows spread over the input that get trial encoded for max_output_mb
+SIZE_SAMPLE_SECONDS = 1.0
+SIZE_SAFETY_MARGIN = 0.92  # aim a bit below the budget, the estimate is not exact
+
+
+class UnsupportedFileError(Exception):
+    pass
+
+
+class ConversionSettings:
+    # Same defaults the settings dialog of the GUI starts with
+
+    def __init__(self):
+        self.bitrate = 500  # in kbps for GIF to MP4
+        self.mp4_to_gif_fps = 30  # Default FPS for MP4 to GIF conversion
+        self.webm_to_gif_fps = 30
+        self.mov_to_gif_fps = 30
+        self.avi_to_gif_fps = 30
+        self.gif_to_mp4_fps = 30  # Default FPS for GIF to MP4 conversion
+        self.gif_to_webm_fps = 30
+        self.gif_to_mov_fps = 30
+        self.gif_to_avi_fps = 30
+        self.selected_format = "mp4"  # Default format for GIF to video conversion
+        self.gif_encoder = "ffmpeg"  # see GIF_ENCODERS, falls back to moviepy when no ffmpeg binary is found
+        self.video_encoder = "ffmpeg"  # see VIDEO_ENCODERS, same fallback
+        self.gif_vfr = True  # keep the GIF's own frame delays (variable frame rate) instead of resampling to gif_to_*_fps
+        self.dedupe_frames = True  # drop repeated GIF frames, the previous frame is simply shown longer (needs gif_vfr)
+        self.cache_dir = None  # folder of the conversion cache, None disables it
+        self.cache_max_mb = 2048  # least recently used entries are evicted above this size
+        self.cache_content_hash = False  # key the cache on a hash of the input content instead of path+size+mtime
+        self.start_time = None  # seconds, only convert from here on (None = from the beginning)
+        self.end_time = None  # seconds, stop here (None = until the end)
+        self.segments = None  # list of (start, end) pairs joined into one output, overrides start_time/end_time
+        self.max_width = 1080  # GIFs are scaled down to fit max_width x max_height (None = no limit)
+        self.max_height = None
+        self.allow_upscale = False  # also scale smaller sources up to the limits (the old fixed width=1080 behaviour)
+        self.scaler = "lanczos"  # see SCALERS
+        self.media_index = None  # file the probe results are kept in between runs (None = only within this process)
+        self.encoder_preset = "fast"  # see ENCODER_PRESETS, applies to GIF to video
+        self.x264_tune = None  # see X264_TUNES, None = no tune (mp4, mov, avi)
+        self.crf = None  # constant quality instead of `bitrate` (lower = better, x264 ~18-28, vp9 ~24-40), None = use bitrate
+        self.video_threads = 0  # encoder threads, 0 = the encoder's own choice (x264) / the CPU count (vp9)
+        self.timing_log = None  # JSON-lines file batch/watch jobs append their stage timings to (None = no timing)
+        self.max_output_mb = None  # size budget of a GIF, lowers size/fps/colours to fit (None = no budget)
+        self.chunked = False  # encode long inputs as time chunks in parallel ffmpeg processes (ffmpeg encoders only)
+        self.chunks = 0  # number of chunks, 0 = pick from the duration and the CPU count
+
+
+def output_file_for(input_path, output_path, extension):
+    return os.path.join(output_path, os.path.splitext(os.path.basename(input_path))[0] + extension)
+
+def parse_time(text):
+    # "75", "1:15" and "0:01:15.5" are all 75(.5) seconds
+    seconds = 0.0
+    for part in str(text).strip().split(":"):
+        seconds = seconds * 60 + float(part)
+    if seconds < 0:
+        raise ValueError(f"Negative time: {text}")
+    return seconds
+
+def selected_ranges(settings):
+    # The (start, end) ranges to convert, end may be None for "until the end"; an empty list means the whole input
+    if settings.segments:
+        ranges = [(float(start), None if end is None else float(end)) for start, end in settings.segments]
+    elif settings.start_time or settings.end_time is not None:
+        ranges = [(float(settings.start_time or 0.0), None if settings.end_time is None else float(settings.end_time))]
+    else:
+        return []
+
+    for start, end in ranges:
+        if start < 0 or (end is not None and end <= start):
+            raise ValueError(f"Error: Invalid time range {start}-{end}.")
+    return ranges
+
+def ranges_duration(ranges, input_duration):
+    # Total length of the selected ranges, None when it depends on an unknown input duration
+    if not ranges:
+        return input_duration
+    total = 0.0
+    for start, end in ranges:
+        if end is None:
+            if input_duration is None:
+                return None
+            end = input_duration
+        total += max(min(end, input_duration or end) - start, 0.0)
+    return total
+
+############################################## ffmpeg helpers ###########################################
+
+# Rebases the first frame to t=0 (phone .mov files often start at an edit list offset); rotation metadata is already applied
+# by ffmpeg's autorotate on decode. The pixel format is left alone: palettegen/paletteuse negotiate RGB themselves (10 bit
+# HEVC included), and forcing yuv420p would halve the chroma of 4:4:4 / RGB sources like screen recordings or ProRes 4444
+NORMALIZE_FILTERS = "setpts=PTS-STARTPTS"
+VIDEO_NORMALIZE_FILTERS = NORMALIZE_FILTERS + ",format=yuv420p"  # GIF to video, the encoders get yuv420p anyway
+
+def trimmed_input_args(input_path, ranges):
+    # -ss/-t before -i seek the demuxer to the keyframe before start instead of decoding from frame 0,
+    # every range becomes its own input of the same file so the cut happens in the one encode pass
+    if not ranges:
+        return ["-fflags", "+genpts", "-i", input_path]
+    args = []
+    for start, end in ranges:
+        args += ["-fflags", "+genpts", "-ss", f"{start:.3f}"]
+        if end is not None:
+            args += ["-t", f"{end - start:.3f}"]
+        args += ["-i", input_path]
+    return args
+
+def source_filter_graph(input_count, normalize_filters=NORMALIZE_FILTERS):
+    # Normalized video of all inputs, joined with the concat filter when several ranges were selected
+    if input_count <= 1:
+        return normalize_filters
+    normalized = "".join(f"[{index}:v]{normalize_filters}[segment{index}];" for index in range(input_count))
+    joined = "".join(f"[segment{index}]" for index in range(input_count))
+    return f"{normalized}{joined}concat=n={input_count}:v=1:a=0"
+
+def target_size(width, height, settings, frames=None):
+    # Output frame size under the resize policy of settings, None = keep the source size
+    if not width or not height:
+        return None
+    limits = []
+    if settings.max_width:
+        limits.append(settings.max_width / width)
+    if settings.max_height:
+        limits.append(settings.max_height / height)
+    if settings.max_output_mb and frames:
+        allowed_pixels = settings.max_output_mb * 1024 * 1024 / (GIF_BYTES_PER_PIXEL * frames)
+        limits.append(math.sqrt(allowed_pixels / (width * height)))
+    if not limits:
+        return None
+
+    scale = min(limits)
+    if not settings.allow_upscale:
+        scale = min(scale, 1.0)
+    size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+    return None if size == (width, height) else size
+
+def scale_filter_for(size, scaler):
+    return "" if size is None else f"scale={size[0]}:{size[1]}:flags={scaler},"
+
+def gif_scale_filter(info, settings, frames=None):
+    width, height = info.display_size  # phone clips are often stored landscape with a 90 degree rotation
+    size = target_size(width, height, settings, frames)
+    if size is not None:
+        return scale_filter_for(size, settings.scaler)
+    if (width and height) or not (settings.max_width or settings.max_height):
+        return ""  # already fits, skip the scaler entirely
+
+    # The probe came back without dimensions, let ffmpeg fit the box itself (never upscaling)
+    width = f"min(iw,{settings.max_width})" if settings.max_width else "iw"
+    height = f"min(ih,{settings.max_height})" if settings.max_height else "ih"
+    return f"scale=w='{width}':h='{height}':force_original_aspect_ratio=decrease:flags={settings.scaler},"
+
+def palettegen_filter(max_colors):
+    return "palettegen" if max_colors >= 256 else f"palettegen=max_colors={max_colors}"
+
+def make_gif_palette(input_path, ranges, scale_filter, max_colors, palette_file, fps=None, keyframes_only=False, cancel_token=None):
+    # First pass: the palette of the selected ranges as a small PNG. palettegen only has it once it saw the last frame,
+    # so in a single split/palettegen/paletteuse graph every frame would sit in memory until the end of the input
+    # (~2.6MB per 1080p frame, gigabytes for a minute of video); as its own pass it streams in constant memory.
+    # keyframes_only (one range only) builds it from the keyframes, quick for a long input at some loss of colour accuracy
+    fps_filter = f"fps={fps}," if fps else ""
+    run_ffmpeg([*(["-skip_frame", "nokey"] if keyframes_only else []), *trimmed_input_args(input_path, ranges),
+                "-lavfi", f"{source_filter_graph(max(len(ranges), 1))},{fps_filter}{scale_filter}{palettegen_filter(max_colors)}",
+                "-frames:v", "1", "-update", "1", palette_file],
+               cancel_token=cancel_token, partial_output=palette_file)
+    return palette_file
+
+def paletteuse_filter_graph(input_count, fps, scale_filter, palette_input):
+    # Second pass: fps and scale run inside ffmpeg (fps first so only kept frames get scaled), then the frames are
+    # mapped onto the palette, which is input number palette_input
+    source = source_filter_graph(input_count) if input_count > 1 else f"[0:v]{NORMALIZE_FILTERS}"
+    return f"{source},fps={fps},{scale_filter}null[frames];[frames][{palette_input}:v]paletteuse=diff_mode=rectangle"
+
+def encode_gif_two_pass(input_path, output_file, ranges, fps, scale_filter, max_colors=256, total_frames=None,
+                        progress_callback=None, cancel_token=None, timed=True):
+    # palettegen pass, then the paletteuse pass that writes output_file; timed=False leaves the stages to the caller
+    input_count = max(len(ranges), 1)
+    palette_dir = tempfile.mkdtemp(prefix="videogif-palette-")
+    palette_file = os.path.join(palette_dir, "palette.png")
+    try:
+        with Stage("palette") if timed else contextlib.nullcontext():
+            make_gif_palette(input_path, ranges, scale_filter, max_colors, palette_file, fps=fps, cancel_token=cancel_token)
+        with Stage("encode", output=output_file) if timed else contextlib.nullcontext():
+            run_ffmpeg([*trimmed_input_args(input_path, ranges), "-i", palette_file,
+                        "-lavfi", paletteuse_filter_graph(input_count, fps, scale_filter, input_count), "-loop", "0", output_file],
+                       total_frames=total_frames, progress_callback=progress_callback, cancel_token=cancel_token,
+                       partial_output=output_file)
+        return output_file
+    finally:
+        shutil.rmtree(palette_dir, ignore_errors=True)
+
+def chunks_for(settings, ranges, input_duration, fps=None):
+    # Time chunks for a parallel encode, [] when the job stays one process: chunking is opt-in, and several
+    # segments are already joined by the concat filter inside one encode
+    if not settings.chunked or len(ranges) > 1:
+        return []
+    start, end = ranges[0] if ranges else (0.0, None)
+    if input_duration:
+        end = input_duration if end is None else min(end, input_duration)
+    if end is None or end <= start:
+        return []
+    chunks = plan_chunks(start, end, settings.chunks, frame_duration=1 / fps if fps else None)
+    return chunks if len(chunks) > 1 else []
+
+def concat_join_args(list_file, extra_args, output_file):
+    # Joins the chunk files with the concat demuxer, the paths in the list are absolute
+    return ["-f", "concat", "-safe", "0", "-i", list_file, *extra_args, output_file]
+
+def moviepy_editor():
+    # moviepy.editor drags in numpy, imageio, PIL and friends, which is most of the start up time, so it is only
+    # imported once a conversion actually takes the moviepy path (later calls are a sys.modules lookup)
+    import moviepy.editor
+    from PIL import Image
+
+    # Monkey patch for the deprecated Image.ANTIALIAS in PIL
+    if not hasattr(Image, 'ANTIALIAS'):
+        Image.ANTIALIAS = Image.Resampling.LANCZOS  # Ensure compatibility with Pillow 10.x
+    return moviepy.editor
+
+def trim_clip(clip, ranges):
+    # moviepy's subclip also seeks with -ss in front of -i, so only the selected ranges get decoded
+    if not ranges:
+        return clip
+    parts = [clip.subclip(start, end) for start, end in ranges]
+    return parts[0] if len(parts) == 1 else moviepy_editor().concatenate_videoclips(parts)
+
+def moviepy_progress_logger(progress_callback=None, cancel_token=None):
+    # proglog comes with moviepy, so the logger class is only built once the moviepy path runs
+    import proglog
+
+    class MoviepyProgressLogger(proglog.ProgressBarLogger):
+        # Forwards moviepy's frame bar to a progress callback, and aborts the write from inside the frame loop on cancel
+
+        def __init__(self):
+            super().__init__()
+            self.start = time.monotonic()
+            self.last_report = 0.0
+
+        def bars_callback(self, bar, attr, value, old_value=None):
+            if cancel_token is not None:
+                cancel_token.raise_if_cancelled()
+            if attr != "index" or bar == "chunk" or progress_callback is None:  # "chunk" is the audio bar
+                return
+
+            now = time.monotonic()
+            frames_done = value + 1
+            total_frames = self.bars[bar].get("total")
+            if now - self.last_report < 0.5 and frames_done != total_frames:
+                return  # called once per frame, keep the callback rate close to the ffmpeg path
+            self.last_report = now
+            elapsed = now - self.start
+            progress_callback(Progress(frames_done, total_frames, frames_done / elapsed if elapsed > 0 else 0.0, elapsed))
+
+    return MoviepyProgressLogger()
+
+def write_with_moviepy(write, output_file, progress_callback=None, cancel_token=None):
+    # write is a clip.write_gif / clip.write_videofile partial that takes the logger
+    logger = "bar" if progress_callback is None and cancel_token is None else moviepy_progress_logger(progress_callback, cancel_token)
+    try:
+        write(logger=logger)
+    except BaseException:
+        remove_partial_output(output_file)
+        raise
+
+############################################## GIF size budget ###########################################
+
+def sample_windows(ranges, input_duration):
+    # SIZE_SAMPLE_COUNT short windows spread evenly over the selected part of the input, plus the length of that part
+    spans = [(start, input_duration if end is None else end) for start, end in ranges] or [(0.0, input_duration)]
+    if any(end is None for _, end in spans):
+        return [], None
+    total = sum(end - start for start, end in spans)
+    if total <= SIZE_SAMPLE_SECONDS * SIZE_SAMPLE_COUNT * 2:
+        return spans, total  # short enough to just trial encode all of it
+
+    windows = []
+    for index in range(SIZE_SAMPLE_COUNT):
+        offset = total * (index + 0.5) / SIZE_SAMPLE_COUNT - SIZE_SAMPLE_SECONDS / 2
+        for start, end in spans:
+            if offset < end - start:
+                window_start = start + max(offset, 0.0)
+                windows.append((window_start, min(window_start + SIZE_SAMPLE_SECONDS, end)))
+                break
+            offset -= end - start
+    return windows, total
+
+def candidate_ladder(fps):
+    # (fps, scale, colours) from best to worst, every step lowers at least one of them so the size only goes down
+    steps = [(fps, 1.0, 256), (fps, 1.0, 128), (20, 0.85, 128), (15, 0.75, 128), (15, 0.6, 96),
+             (12, 0.5, 64), (10, 0.4, 64), (10, 0.3, 32), (8, 0.25, 32)]
+    ladder = []
+    for step_fps, scale, colors in steps:
+        candidate = (min(fps, step_fps), scale, colors)
+        if candidate not in ladder:
+            ladder.append(candidate)
+    return ladder
+
+def estimate_gif_bytes(input_path, windows, total_seconds, fps, size, colors, scaler, cancel_token=None):
+    # Trial encodes only the sample windows and scales their size up to the full length
+    fd, sample_file = tempfile.mkstemp(suffix=".gif")
+    os.close(fd)
+    try:
+        encode_gif_two_pass(input_path, sample_file, windows, fps, scale_filter_for(size, scaler), colors,
+                            cancel_token=cancel_token, timed=False)  # counts towards the size_plan stage
+        sample_seconds = sum(end - start for start, end in windows)
+        return os.path.getsize(sample_file) / sample_seconds * total_seconds
+    finally:
+        remove_partial_output(sample_file)
+
+def plan_gif_for_budget(input_path, info, settings, fps, ranges, cancel_token=None):
+    # Picks the best (fps, size, colours) predicted to fit max_output_mb with a handful of trial encodes of short samples
+    # instead of full encodes; returns None when the input can't be sampled (unknown duration or size)
+    width, height = info.display_size
+    windows, total_seconds = sample_windows(ranges, info.duration)
+    if not windows or not total_seconds or not width or not height:
+        return None
+
+    budget = settings.max_output_mb * 1024 * 1024 * SIZE_SAFETY_MARGIN
+    base_width, base_height = target_size(width, height, settings) or (width, height)
+    ladder = candidate_ladder(fps)
+
+    def plan(index):
+        candidate_fps, scale, colors = ladder[index]
+        size = (max(int(round(base_width * scale)), 1), max(int(round(base_height * scale)), 1))
+        return candidate_fps, None if size == (width, height) else size, colors
+
+    # The ladder is ordered by size, so a binary search needs about log2(len(ladder)) trial encodes
+    low, high, best = 0, len(ladder) - 1, len(ladder) - 1
+    while low <= high:
+        middle = (low + high) // 2
+        candidate_fps, size, colors = plan(middle)
+        if estimate_gif_bytes(input_path, windows, total_seconds, candidate_fps, size, colors, settings.scaler, cancel_token) <= budget:
+            best, high = middle, middle - 1
+        else:
+            low = middle + 1
+    return plan(best)
+
+############################This is the part with the conversion function from the video format to gif#######################################
+
+def video_to_gif_chunked(input_path, output_file, chunks, fps, scale_filter, max_colors, total_frames,
+                         progress_callback=None, cancel_token=None):
+    # Every chunk has to be mapped onto the same palette, otherwise the colours would jump at each cut. The palette is
+    # built up front from the keyframes only (-skip_frame nokey), which is quick and sees the whole clip.
+    # The join runs paletteuse again without dithering: all chunk pixels are already palette colours, so it maps them 1:1
+    palette_dir = tempfile.mkdtemp(prefix="videogif-palette-")
+    palette_file = os.path.join(palette_dir, "palette.png")
+    start, end = chunks[0][0], chunks[-1][1]
+    try:
+        with Stage("palette"):
+            make_gif_palette(input_path, [(start, end)], scale_filter, max_colors, palette_file, keyframes_only=True,
+                             cancel_token=cancel_token)
+
+        def chunk_args(chunk_start, chunk_end, chunk_file):
+            return [*trimmed_input_args(input_path, [(chunk_start, chunk_end)]), "-i", palette_file,
+                    "-lavfi", paletteuse_filter_graph(1, fps, scale_filter, 1), "-loop", "0", chunk_file]
+
+        def join_args(list_file, joined_file):
+            return concat_join_args(list_file, ["-i", palette_file, "-lavfi", "[0:v][1:v]paletteuse=dither=none:diff_mode=rectangle",
+                                                "-loop", "0"], joined_file)
+
+        return encode_chunked(chunks, chunk_args, ".gif", join_args, output_file, total_frames=total_frames,
+                              progress_callback=progress_callback, cancel_token=cancel_token)
+    finally:
+        shutil.rmtree(palette_dir, ignore_errors=True)
+
+def video_to_gif_ffmpeg(input_path, output_file, fps, settings, ranges=(), progress_callback=None, cancel_token=None):
+    # Two ffmpeg passes (palette, then encode): decode, resize, palette and encode without any frame crossing into Python
+    info = media_info(input_path, settings.media_index)
+    duration = ranges_duration(ranges, info.duration)
+    max_colors = 256
+
+    budget_plan = None
+    if settings.max_output_mb:
+        with Stage("size_plan"):
+            budget_plan = plan_gif_for_budget(input_path, info, settings, fps, ranges, cancel_token)
+    if budget_plan is not None:
+        fps, size, max_colors = budget_plan
+        scale_filter = scale_filter_for(size, settings.scaler)
+    total_frames = max(int(round(duration * fps)), 1) if duration else None
+    if budget_plan is None:
+        scale_filter = gif_scale_filter(info, settings, total_frames)
+
+    chunks = chunks_for(settings, ranges, info.duration, fps)
+    if chunks:
+        return video_to_gif_chunked(input_path, output_file, chunks, fps, scale_filter, max_colors, total_frames,
+                                    progress_callback, cancel_token)
+
+    # +genpts (in trimmed_input_args) rebuilds missing timestamps, which is the other thing that made .mov input glitchy
+    return encode_gif_two_pass(input_path, output_file, ranges, fps, scale_filter, max_colors, total_frames,
+                               progress_callback, cancel_token)
+
+def video_to_gif_moviepy(input_path, output_file, fps, settings, ranges=(), progress_callback=None, cancel_token=None):
+    # moviepy decodes through ffmpeg too (autorotated) and samples frames at exactly `fps`, so .mov needs no temp file here either
+    with Stage("open"):
+        video = moviepy_editor().VideoFileClip(input_path, audio=False)
+    video_resized = trim_clip(video, ranges)
+
+    # Same resize policy as the ffmpeg path, but the resampling happens per frame in Python (PIL) here
+    size = target_size(video_resized.w, video_resized.h, settings, int(video_resized.duration * fps))
+    if size is not None:
+        video_resized = video_resized.resize(newsize=size)
+    try:
+        with Stage("encode", output=output_file):  # decode, Python resize and GIF write all happen frame by frame in here
+            write_with_moviepy(lambda logger: video_resized.write_gif(output_file, fps=fps, program='ffmpeg', opt="optimizeplus", logger=logger),
+                               output_file, progress_callback, cancel_token)
+            add_frames(int(round(video_resized.duration * fps)))
+    finally:
+        video.close()
+    return output_file
+
+def video_to_gif(input_path, output_path, settings, fps, progress_callback=None, cancel_token=None):
+    output_file = output_file_for(input_path, output_path, ".gif")
+    ranges = selected_ranges(settings)
+    if settings.gif_encoder == "ffmpeg" and ffmpeg_binary() is not None:
+        return video_to_gif_ffmpeg(input_path, output_file, fps, settings, ranges, progress_callback, cancel_token)
+    return video_to_gif_moviepy(input_path, output_file, fps, settings, ranges, progress_callback, cancel_token)
+
+def mp4_to_gif(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    return video_to_gif(input_path, output_path, settings, settings.mp4_to_gif_fps, progress_callback, cancel_token)
+
+def webm_to_gif(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    return video_to_gif(input_path, output_path, settings, settings.webm_to_gif_fps, progress_callback, cancel_token)
+
+#mov used to go through a temporary mp4 because the direct conversion was waaaaay too glitchy (phone clips with an offset start
+#timestamp, rotation metadata and 10 bit pixel formats), the gif filter graph now normalizes all of that in-stream instead
+def mov_to_gif(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    return video_to_gif(input_path, output_path, settings, settings.mov_to_gif_fps, progress_callback, cancel_token)
+
+def avi_to_gif(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    return video_to_gif(input_path, output_path, settings, settings.avi_to_gif_fps, progress_callback, cancel_token)
+
+############################This is the part with the conversion function from the gif format to video#######################################
+
+def encoder_thread_args(codec, settings, width=None):
+    # libx264 threads itself well, libvpx runs on one thread unless told otherwise: row-mt lets it use threads within
+    # each tile column, and the frame is cut into as many tile columns as its width allows
+    threads = settings.video_threads or (min(os.cpu_count() or 1, VP9_MAX_THREADS) if codec == "libvpx-vp9" else 0)
+    args = ["-threads", str(threads)] if threads else []
+    if codec == "libvpx-vp9":
+        tile_columns = int(math.log2(max(width // VP9_MIN_TILE_WIDTH, 1))) if width else 2
+        args += ["-row-mt", "1", "-tile-columns", str(min(tile_columns, 6))]
+    return args
+
+def codec_tuning_args(codec, settings, width=None):
+    # Speed preset, tune, constant quality and threads, everything but codec, bitrate and the x264 -preset itself
+    # (which moviepy takes as its own parameter)
+    args = []
+    if codec == "libvpx-vp9":
+        args += VP9_SPEEDS[settings.encoder_preset]
+    if codec == "libx264" and settings.x264_tune:
+        args += ["-tune", settings.x264_tune]
+    if settings.crf is not None:
+        args += ["-crf", str(settings.crf)]
+        if codec == "libvpx-vp9":
+            args += ["-b:v", "0"]  # vp9 only does pure constant quality with the bitrate unset
+    return args + encoder_thread_args(codec, settings, width)
+
+def video_encoder_args(codec, output_format, settings, width=None):
+    args = ["-c:v", codec]
+    if codec == "libx264":
+        args += ["-preset", X264_PRESETS[settings.encoder_preset]]
+    args += codec_tuning_args(codec, settings, width)
+    if settings.crf is None:
+        args += ["-b:v", f"{settings.bitrate}k"]
+    args += ["-pix_fmt", "yuv420p"]
+    if output_format in ("mp4", "mov"):
+        args += ["-movflags", "+faststart"]
+    return args
+
+def gif_to_video_ffmpeg(input_path, output_file, codec, fps, settings, ranges=(), progress_callback=None, cancel_token=None):
+    # The GIF is streamed through one ffmpeg process, which decodes one frame at a time, so memory stays flat however long it is.
+    # With gif_vfr every GIF frame keeps its own delay as a timestamp instead of being copied until the next 1/fps tick,
+    # and mpdecimate drops frames that repeat the previous one exactly (the earlier frame just stays on screen longer); its
+    # default thresholds would also drop frames that are merely similar, i.e. lose a blinking cursor, typing or a small sprite
+    output_format = os.path.splitext(output_file)[1][1:]
+    vfr = settings.gif_vfr and output_format in VFR_FORMATS
+
+    filters = [source_filter_graph(max(len(ranges), 1), VIDEO_NORMALIZE_FILTERS)]
+    if vfr and settings.dedupe_frames:
+        # Note: duplicates at the very end of the GIF are dropped too, and nothing follows the last kept frame to extend
+        # its display time, so the final hold of the GIF comes out shorter (down to that one frame's own delay)
+        filters.append("mpdecimate=hi=0:lo=0:frac=0")
+    if not vfr:
+        filters.append(f"fps={fps}")
+    filters.append("scale=trunc(iw/2)*2:trunc(ih/2)*2")  # yuv420p encoders want even dimensions, GIFs often aren't
+
+    # Always probed, for the progress total (and the vp9 tile columns): the result is cached and counting a GIF's frames
+    # only demuxes it. With mpdecimate the total is an upper bound, the dropped duplicates never get encoded
+    info = media_info(input_path, settings.media_index)
+    duration = ranges_duration(ranges, info.duration)
+    rate = fps if not vfr else info.fps
+    total_frames = max(int(round(duration * rate)), 1) if duration and rate else None
+    if vfr and not ranges and info.frames:
+        total_frames = info.frames  # exact for GIFs, the probe counts their frames
+
+    encoder_args = ["-an", *video_encoder_args(codec, output_format, settings, info.display_size[0])]
+    if vfr:
+        encoder_args += ["-vsync", "vfr"]  # -fps_mode only exists from ffmpeg 5.1 on, -vsync is (deprecated but) everywhere
+
+    # Not in vfr mode: every chunk would be rebased to 0 and deduplicated on its own, and a chunk ending in a run of
+    # duplicates loses that hold, so the concat demuxer starts the next chunk too early and the video comes out short
+    chunks = [] if vfr else chunks_for(settings, ranges, info.duration, fps)
+    if chunks:
+        # Same codec settings in every chunk, so the join is a plain stream copy
+        def chunk_args(chunk_start, chunk_end, chunk_file):
+            return [*trimmed_input_args(input_path, [(chunk_start, chunk_end)]), "-lavfi", ",".join(filters), *encoder_args, chunk_file]
+
+        def join_args(list_file, joined_file):
+            faststart = ["-movflags", "+faststart"] if output_format in ("mp4", "mov") else []
+            return concat_join_args(list_file, ["-c", "copy", *faststart], joined_file)
+
+        return encode_chunked(chunks, chunk_args, "." + output_format, join_args, output_file, total_frames=total_frames,
+                              progress_callback=progress_callback, cancel_token=cancel_token)
+
+    args = [*trimmed_input_args(input_path, ranges), "-lavfi", ",".join(filters), *encoder_args]
+    with Stage("encode", output=output_file):
+        run_ffmpeg([*args, output_file], total_frames=total_frames, progress_callback=progress_callback,
+                   cancel_token=cancel_token, partial_output=output_file)
+    return output_file
+
+def gif_to_video_moviepy(input_path, output_file, codec, fps, settings, ranges=(), progress_callback=None, cancel_token=None):
+    with Stage("open"):
+        clip = moviepy_editor().VideoFileClip(input_path)
+    trimmed = trim_clip(clip, ranges)
+    try:
+        # Same presets as the ffmpeg path, moviepy passes the x264 preset itself and appends ffmpeg_params to its command
+        options = {"preset": X264_PRESETS[settings.encoder_preset]} if codec == "libx264" else {}
+        bitrate = None if settings.crf is not None else f"{settings.bitrate}k"
+        with Stage("encode", output=output_file):
+            write_with_moviepy(lambda logger: trimmed.write_videofile(output_file, codec=codec, fps=fps, bitrate=bitrate, logger=logger,
+                                                                      ffmpeg_params=codec_tuning_args(codec, settings, trimmed.w),
+                                                                      **options),
+                               output_file, progress_callback, cancel_token)
+            add_frames(int(round(trimmed.duration * fps)))
+    finally:
+        clip.close()
+    return output_file
+
+def gif_to_video(input_path, output_path, extension, codec, fps, settings, progress_callback=None, cancel_token=None):
+    output_file = output_file_for(input_path, output_path, extension)
+    ranges = selected_ranges(settings)
+    if settings.video_encoder == "ffmpeg" and ffmpeg_binary() is not None:
+        return gif_to_video_ffmpeg(input_path, output_file, codec, fps, settings, ranges, progress_callback, cancel_token)
+    return gif_to_video_moviepy(input_path, output_file, codec, fps, settings, ranges, progress_callback, cancel_token)
+
+def gif_to_mp4(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    # Optimization: Apply FPS and bitrate based on settings
+    return gif_to_video(input_path, output_path, ".mp4", 'libx264', settings.gif_to_mp4_fps, settings, progress_callback, cancel_token)
+
+def gif_to_webm(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    # VP9 instead of the old single threaded VP8 'libvpx', see encoder_thread_args for how it gets its threads
+    return gif_to_video(input_path, output_path, ".webm", 'libvpx-vp9', settings.gif_to_webm_fps, settings, progress_callback, cancel_token)
+
+def gif_to_mov(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    # Use 'libx264' codec with higher bitrate and constant FPS for better quality
+    return gif_to_video(input_path, output_path, ".mov", 'libx264', settings.gif_to_mov_fps, settings, progress_callback, cancel_token)
+
+def gif_to_avi(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    # Use 'libx264' codec with higher bitrate and constant FPS for smoother playback
+    return gif_to_video(input_path, output_path, ".avi", 'libx264', settings.gif_to_avi_fps, settings, progress_callback, cancel_token)
+
+############################################## Dispatch ###########################################
+
+VIDEO_TO_GIF = {
+    ".mp4": mp4_to_gif,
+    ".webm": webm_to_gif,
+    ".mov": mov_to_gif,
+    ".avi": avi_to_gif,
+}
+
+GIF_TO_VIDEO = {
+    "mp4": gif_to_mp4,
+    "webm": gif_to_webm,
+    "mov": gif_to_mov,
+    "avi": gif_to_avi,
+}
+
+def input_format(input_path):
+    # Container of the input by content, not by name, so a mislabelled file takes the right path
+    # and anything else is rejected before an expensive open
+    container = detect_format(input_path)
+    if container is None:
+        raise UnsupportedFileError("Error: Unsupported file type. Please select a .mp4, .webm, .mov, .avi, or .gif file.")
+    return container
+
+def is_supported_input(input_path):
+    # Cheap filter for folder scans: a known extension, or content that looks like one of the supported containers
+    file_extension = os.path.splitext(input_path)[1].lower()
+    if file_extension in SUPPORTED_VIDEO_FORMATS or file_extension in SUPPORTED_GIF_FORMATS:
+        return True
+    return detect_format(input_path) is not None
+
+def output_extension(input_path, settings):
+    if input_format(input_path) != "gif":
+        return ".gif"
+    if settings.selected_format not in GIF_TO_VIDEO:
+        raise ValueError(f"Error: Unsupported output format '{settings.selected_format}'.")
+    return "." + settings.selected_format
+
+def effective_settings(input_path, settings):
+    # Only the settings that change the output of this particular input, so e.g. the gif->video fps don't invalidate cached gifs
+    container = input_format(input_path)
+    # A chunked GIF gets its palette from the keyframes only and a chunked video restarts its GOP at every cut,
+    # so chunked and whole-file results are not interchangeable
+    chunking = {"chunked": settings.chunked, "chunks": settings.chunks if settings.chunked else 0}
+    if container != "gif":
+        encoder = settings.gif_encoder if ffmpeg_binary() is not None else "moviepy"
+        return {"output": "gif", "fps": getattr(settings, f"{container}_to_gif_fps"), "gif_encoder": encoder,
+                "ranges": selected_ranges(settings), "max_width": settings.max_width, "max_height": settings.max_height,
+                "allow_upscale": settings.allow_upscale, "scaler": settings.scaler, "max_output_mb": settings.max_output_mb,
+                **chunking}
+    encoder = settings.video_encoder if ffmpeg_binary() is not None else "moviepy"
+    return {"output": settings.selected_format, "fps": getattr(settings, f"gif_to_{settings.selected_format}_fps"),
+            "bitrate": settings.bitrate, "ranges": selected_ranges(settings), "video_encoder": encoder,
+            "gif_vfr": settings.gif_vfr, "dedupe_frames": settings.dedupe_frames, "encoder_preset": settings.encoder_preset,
+            "x264_tune": settings.x264_tune, "crf": settings.crf, **chunking}
+
+def run_converter(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    container = input_format(input_path)
+    if container != "gif":
+        return VIDEO_TO_GIF["." + container](input_path, output_path, settings, progress_callback, cancel_token)
+    return GIF_TO_VIDEO[settings.selected_format](input_path, output_path, settings, progress_callback, cancel_token)
+
+def convert_file(input_path, output_path, settings, progress_callback=None, cancel_token=None):
+    # Converts one file and returns the path of the written output, raises on any failure
+    # progress_callback receives ffmpeg_runner.Progress objects, cancel_token.cancel() stops the encoder and raises ConversionCancelled
+    if not os.path.isfile(input_path):
+        raise FileNotFoundError("Error: Input file does not exist.")
+
+    # Also rejects unsupported file types, output formats and time ranges before anything expensive happens
+    output_file = output_file_for(input_path, output_path, output_extension(input_path, settings))
+    selected_ranges(settings)
+    if os.path.abspath(output_file) == os.path.abspath(input_path):
+        # e.g. a GIF named .mp4 converted to mp4 next to itself
+        raise ValueError("Error: The output file would overwrite the input file.")
+
+    if settings.cache_dir:
+        cache = ConversionCache(settings.cache_dir, settings.cache_max_mb * 1024 * 1024, settings.cache_content_hash)
+        with Stage("cache_lookup"):  # includes hashing the whole input with cache_content_hash
+            key = cache.key(input_path, effective_settings(input_path, settings))
+            hit = cache.fetch(key, output_file)
+        if hit:
+            return output_file
+
+    # The encoders write with -y / O_TRUNC, so an old output that is still hard linked to somewhere else (e.g. a cache
+    # entry placed by an older version) has to go first, otherwise it would be written through the link
+    if os.path.lexists(output_file):
+        os.remove(output_file)
+    if not settings.cache_dir:
+        return run_converter(input_path, output_path, settings, progress_callback, cancel_token)
+
+    output_file = run_converter(input_path, output_path, settings, progress_callback, cancel_token)
+    with Stage("cache_store"):
+        cache.store(key, output_file)
+    return output_file
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+import gi
+gi.require_version("Gtk", "3.0")
+from gi.repository import Gtk, GObject
+import os
+import threading
+
+import convert_core
+from conversion_cache import default_cache_dir
+from ffmpeg_runner import CancelToken, ConversionCancelled
+from media_probe import default_index_file
+import settings_profiles
+
+#this is converter_window.py, the GTK window of the app; videogifconvert-2.py only imports it when the window is shown
+#the conversion functions themselves live in convert_core.py, for headless / batch use see batch_convert.py
+
+# Dialog values that are stored as they are in the "gui" settings profile, so they survive a restart. The time range is
+# left out on purpose: it belongs to one particular file, and the main window doesn't show it, so a range carried over
+# from an earlier session would silently cut every later conversion short
+SAVED_SETTINGS = ["bitrate", "mp4_to_gif_fps", "webm_to_gif_fps", "mov_to_gif_fps", "avi_to_gif_fps", "gif_to_mp4_fps",
+                  "gif_to_webm_fps", "gif_to_mov_fps", "gif_to_avi_fps", "selected_format", "gif_encoder", "allow_upscale",
+                  "gif_vfr", "encoder_preset"]
+
+class ConverterApp(Gtk.Window):
+
+    def __init__(self):
+        super().__init__(title="Video <-> Gif")
+        self.set_border_width(10)
+        self.set_default_size(600, 165)
+
+        # Default conversion settings
+        self.bitrate = 500  # in kbps for GIF to MP4
+        self.mp4_to_gif_fps = 30  # Default FPS for MP4 to GIF conversion
+        self.webm_to_gif_fps = 30
+        self.mov_to_gif_fps = 30
+        self.avi_to_gif_fps = 30
+        self.gif_to_mp4_fps = 30  # Default FPS for GIF to MP4 conversion
+        self.gif_to_webm_fps = 30
+        self.gif_to_mov_fps = 30
+        self.gif_to_avi_fps = 30
+        self.selected_format = "mp4"  # Default format for GIF to video conversion
+        self.gif_encoder = "ffmpeg"  # "ffmpeg" palette pass or the old "moviepy" frame piping
+        self.start_time = None  # Part of the input to convert, in seconds (None = from the beginning / until the end)
+        self.end_time = None
+        self.max_width = 1080  # GIFs are scaled down to this width (0 = keep the source width)
+        self.allow_upscale = False
+        self.max_output_mb = 0  # GIF size budget in MB (0 = no limit)
+        self.encoder_preset = "fast"  # speed/quality of the GIF to video encoders, see convert_core.ENCODER_PRESETS
+        self.gif_vfr = True  # GIF to video keeps the GIF's frame timing, the GIF to video FPS sliders only apply when off
+        self.load_saved_settings()
+
+        # Create main vertical box
+        vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=10)
+        self.add(vbox)
+
+        # Input file path row
+        input_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        vbox.pack_start(input_hbox, False, False, 0)
+
+        input_label = Gtk.Label(label="Input Path:")
+        input_hbox.pack_start(input_label, False, False, 0)
+
+        self.input_entry = Gtk.Entry()
+        input_hbox.pack_start(self.input_entry, True, True, 0)
+        self.input_directory=""  #this variable stores the input file so that it can be automatically selected as the output folder
+
+        input_file_button = Gtk.Button(label="Select Input File")
+        input_file_button.connect("clicked", self.on_select_input_file)
+        input_hbox.pack_start(input_file_button, False, False, 0)
+
+        # Output file path row
+        output_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        vbox.pack_start(output_hbox, False, False, 0)
+
+        output_label = Gtk.Label(label="Output Path:")
+        output_hbox.pack_start(output_label, False, False, 0)
+
+        self.output_entry = Gtk.Entry()
+        output_hbox.pack_start(self.output_entry, True, True, 0)
+
+        output_directory_button = Gtk.Button(label="Select Output Folder")
+        output_directory_button.connect("clicked", self.on_select_output_directory)
+        output_hbox.pack_start(output_directory_button, False, False, 0)
+
+        # Settings button at the bottom
+        settings_button = Gtk.Button(label="Settings")
+        settings_button.connect("clicked", self.on_open_settings)
+        vbox.pack_end(settings_button, False, False, 0)
+
+        # Convert and cancel buttons
+        convert_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        vbox.pack_start(convert_hbox, False, False, 0)
+
+        self.convert_button = Gtk.Button(label="Convert")
+        self.convert_button.connect("clicked", self.on_convert_file)
+        convert_hbox.pack_start(self.convert_button, True, True, 0)
+
+        self.cancel_button = Gtk.Button(label="Cancel")
+        self.cancel_button.connect("clicked", self.on_cancel_conversion)
+        self.cancel_button.set_sensitive(False)
+        convert_hbox.pack_start(self.cancel_button, False, False, 0)
+
+        # Progress bar and status label for progress updates
+        self.progress_bar = Gtk.ProgressBar()
+        vbox.pack_start(self.progress_bar, False, False, 0)
+
+        self.status_label = Gtk.Label(label="")
+        vbox.pack_start(self.status_label, False, False, 0)
+
+        # Set while a conversion runs, cancel() on it stops the encoder
+        self.cancel_token = None
+    
+    ############################ This is the part where the buttons & menus functionality is coded #######################################
+
+    def on_select_input_file(self, widget):
+        dialog = Gtk.FileChooserDialog(
+            title="Select Input File", parent=self, action=Gtk.FileChooserAction.OPEN
+        )
+        dialog.add_buttons(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL, Gtk.STOCK_OPEN, Gtk.ResponseType.OK)
+        response = dialog.run()
+        if response == Gtk.ResponseType.OK:
+            input_file_path = dialog.get_filename()
+            self.input_entry.set_text(input_file_path)
+            self.input_directory = os.path.dirname(input_file_path)
+            self.output_entry.set_text(self.input_directory) # Automatically set the output directory to the same folder as the input
+        dialog.destroy()
+
+    def on_select_output_directory(self, widget):
+        dialog = Gtk.FileChooserDialog(
+            title="Select Output Directory", parent=self, action=Gtk.FileChooserAction.SELECT_FOLDER
+        )
+        dialog.add_buttons(Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL, Gtk.STOCK_OPEN, Gtk.ResponseType.OK)
+        response = dialog.run()
+        if response == Gtk.ResponseType.OK:
+            self.output_entry.set_text(dialog.get_filename())
+        if self.input_directory:
+            dialog.set_current_folder(self.input_directory)    
+        dialog.destroy()
+
+    def update_status(self, message):
+        GObject.idle_add(self.status_label.set_text, message)  # Update the label from the main thread
+
+    def show_progress(self, progress):
+        # Runs on the main thread, see report_progress
+        if progress.fraction is None:
+            self.progress_bar.pulse()
+        else:
+            self.progress_bar.set_fraction(progress.fraction)
+        self.status_label.set_text(f"Processing: {progress}")
+        return False
+
+    def report_progress(self, progress):
+        # Progress callback for convert_core, called from the conversion thread
+        GObject.idle_add(self.show_progress, progress)
+
+    def set_converting(self, converting):
+        self.convert_button.set_sensitive(not converting)
+        self.cancel_button.set_sensitive(converting)
+        if converting:
+            self.progress_bar.set_fraction(0.0)
+        return False
+    
+    ############################################## The part below handles the threads ###########################################
+
+    def conversion_settings(self):
+        # Snapshot of the settings dialog values for convert_core
+        settings = convert_core.ConversionSettings()
+        settings.bitrate = self.bitrate
+        settings.mp4_to_gif_fps = self.mp4_to_gif_fps
+        settings.webm_to_gif_fps = self.webm_to_gif_fps
+        settings.mov_to_gif_fps = self.mov_to_gif_fps
+        settings.avi_to_gif_fps = self.avi_to_gif_fps
+        settings.gif_to_mp4_fps = self.gif_to_mp4_fps
+        settings.gif_to_webm_fps = self.gif_to_webm_fps
+        settings.gif_to_mov_fps = self.gif_to_mov_fps
+        settings.gif_to_avi_fps = self.gif_to_avi_fps
+        settings.selected_format = self.selected_format
+        settings.gif_encoder = self.gif_encoder
+        settings.start_time = self.start_time
+        settings.end_time = self.end_time
+        settings.max_width = self.max_width or None
+        settings.allow_upscale = self.allow_upscale
+        settings.max_output_mb = self.max_output_mb or None
+        settings.gif_vfr = self.gif_vfr
+        settings.encoder_preset = self.encoder_preset
+        settings.cache_dir = default_cache_dir()  # repeat conversions of an unchanged file come straight from the cache
+        settings.media_index = default_index_file()
+        return settings
+
+    def load_saved_settings(self):
+        # Settings of the last session, see SAVED_SETTINGS
+        try:
+            settings = settings_profiles.load_profile(settings_profiles.GUI_PROFILE)
+        except ValueError:
+            return  # first start, or a profile this version can't read
+        for name in SAVED_SETTINGS:
+            setattr(self, name, getattr(settings, name))
+        self.max_width = settings.max_width or 0
+        self.max_output_mb = int(settings.max_output_mb or 0)
+
+    def save_settings(self):
+        try:
+            settings_profiles.save_profile(settings_profiles.GUI_PROFILE, self.conversion_settings())  # without the range
+        except OSError as e:
+            self.update_status(f"Could not save the settings: {e.strerror}")
+
+    def show_unsupported_file_dialog(self, message):
+        dialog = Gtk.MessageDialog(
+            parent=self, flags=0, message_type=Gtk.MessageType.WARNING,
+            buttons=Gtk.ButtonsType.OK, text="Input Error",
+        )
+        dialog.format_secondary_text(message)
+        dialog.run()
+        dialog.destroy()
+        return False
+
+    def conversion_thread(self, input_path, output_path):
+        conversion_successful = True  # Flag to track conversion success
+        try:
+            # The actual work (validation, dispatch on the file extension, encoding) lives in convert_core
+            convert_core.convert_file(input_path, output_path, self.conversion_settings(),
+                                      progress_callback=self.report_progress, cancel_token=self.cancel_token)
+
+        except ConversionCancelled:
+            # The partial output has already been removed by convert_core
+            self.update_status("Conversion cancelled.")
+            conversion_successful = False
+
+        except convert_core.UnsupportedFileError as e:
+            # Unsupported file type
+            self.update_status(str(e))
+            GObject.idle_add(self.show_unsupported_file_dialog, str(e))
+            conversion_successful = False
+
+        except FileNotFoundError as e:
+            self.update_status(str(e))
+            conversion_successful = False
+
+        except Exception as e:
+            # Catch any other unexpected errors during conversion
+            self.update_status(f"Error during conversion: {str(e)}")
+            conversion_successful = False
+
+        finally:
+            self.cancel_token = None
+            GObject.idle_add(self.set_converting, False)
+
+            if conversion_successful:
+                GObject.idle_add(self.progress_bar.set_fraction, 1.0)
+                GObject.idle_add(self.update_status, "Conversion completed.")
+                GObject.timeout_add(5000, self.clear_status)
+    
+    ####################################################################################################################
+
+    def clear_status(self):
+        self.status_label.set_text("")  # Clear the status label
+        self.progress_bar.set_fraction(0.0)
+        return False  # Return False to stop the timeout from repeating            
+
+    def on_convert_file(self, widget):
+        input_path = self.input_entry.get_text()
+        output_path = self.output_entry.get_text()
+
+        if not input_path or not output_path:
+            dialog = Gtk.MessageDialog(
+                parent=self, flags=0, message_type=Gtk.MessageType.WARNING,
+                buttons=Gtk.ButtonsType.OK, text="Input Error",
+            )
+            dialog.format_secondary_text("Please select both an input file and an output directory.")
+            dialog.run()
+            dialog.destroy()
+            return
+
+        self.cancel_token = CancelToken()
+        self.set_converting(True)
+        self.status_label.set_text("Processing...")
+
+        # Start conversion in a new thread
+        threading.Thread(target=self.conversion_thread, args=(input_path, output_path)).start()
+
+    def on_cancel_conversion(self, widget):
+        if self.cancel_token is not None:
+            self.cancel_token.cancel()
+            self.status_label.set_text("Cancelling...")
+
+    def on_format_toggled(self, button, format_value):
+        if button.get_active():
+            self.selected_format = format_value
+
+    def on_gif_encoder_toggled(self, button, encoder):
+        if button.get_active():
+            self.gif_encoder = encoder
+
+    def on_encoder_preset_toggled(self, button, preset):
+        if button.get_active():
+            self.encoder_preset = preset
+
+    def on_open_settings(self, widget):
+        # this creates a dialog window for settings
+        dialog = Gtk.Dialog(title="Settings", transient_for=self, flags=0)
+        dialog.add_buttons(Gtk.STOCK_OK, Gtk.ResponseType.OK)
+
+        # Get the content area of the dialog
+        content_area = dialog.get_content_area()
+        vbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
+        content_area.pack_start(vbox, True, True, 0)
+
+        vbox.pack_start(Gtk.Label(label="Select output format for GIF:"), False, False, 0)
+        format_group = None
+        formats = [("MP4", "mp4"), ("WEBM", "webm"), ("MOV", "mov"), ("AVI", "avi")]
+
+        for label, format_value in formats:
+            radio_button = Gtk.RadioButton.new_with_label_from_widget(format_group, label)
+            format_group = radio_button
+            vbox.pack_start(radio_button, False, False, 0)
+
+            if format_value == self.selected_format:
+                radio_button.set_active(True)
+
+            radio_button.connect("toggled", self.on_format_toggled, format_value)
+
+        encoder_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
+        content_area.pack_start(encoder_hbox, True, True, 0)
+
+        encoder_hbox.pack_start(Gtk.Label(label="GIF encoder:"), False, False, 0)
+        encoder_group = None
+        encoders = [("FFmpeg palette (fast)", "ffmpeg"), ("MoviePy", "moviepy")]
+
+        for label, encoder in encoders:
+            radio_button = Gtk.RadioButton.new_with_label_from_widget(encoder_group, label)
+            encoder_group = radio_button
+            encoder_hbox.pack_start(radio_button, False, False, 0)
+
+            if encoder == self.gif_encoder:
+                radio_button.set_active(True)
+
+            radio_button.connect("toggled", self.on_gif_encoder_toggled, encoder)
+
+        preset_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=15)
+        content_area.pack_start(preset_hbox, True, True, 0)
+
+        preset_hbox.pack_start(Gtk.Label(label="Video encoder speed:"), False, False, 0)
+        preset_group = None
+        presets = [("Fast", "fast"), ("Balanced", "balanced"), ("Best quality", "quality")]
+
+        for label, preset in presets:
+            radio_button = Gtk.RadioButton.new_with_label_from_widget(preset_group, label)
+            preset_group = radio_button
+            preset_hbox.pack_start(radio_button, False, False, 0)
+
+            if preset == self.encoder_preset:
+                radio_button.set_active(True)
+
+            radio_button.connect("toggled", self.on_encoder_preset_toggled, preset)
+
+        # Create sliders for bitrate and FPS settings
+        bitrate_adjustment = Gtk.Adjustment(value=self.bitrate, lower=100, upper=1000, step_increment=10)
+        fps_adjustment_mp4_to_gif = Gtk.Adjustment(value=self.mp4_to_gif_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_webm_to_gif = Gtk.Adjustment(value=self.webm_to_gif_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_mov_to_gif = Gtk.Adjustment(value=self.mov_to_gif_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_avi_to_gif = Gtk.Adjustment(value=self.avi_to_gif_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_gif_to_mp4 = Gtk.Adjustment(value=self.gif_to_mp4_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_gif_to_webm = Gtk.Adjustment(value=self.gif_to_webm_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_gif_to_mov = Gtk.Adjustment(value=self.gif_to_mov_fps, lower=1, upper=60, step_increment=1)
+        fps_adjustment_gif_to_avi = Gtk.Adjustment(value=self.gif_to_avi_fps, lower=1, upper=60, step_increment=1)
+
+        bitrate_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=bitrate_adjustment)
+        fps_slider_mp4_to_gif = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_mp4_to_gif)
+        fps_slider_gif_to_mp4 = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_gif_to_mp4)
+
+        #bitrate_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=bitrate_adjustment)
+        fps_slider_webm_to_gif = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_webm_to_gif)
+        fps_slider_gif_to_webm = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_gif_to_webm)
+
+        #bitrate_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=bitrate_adjustment)
+        fps_slider_mov_to_gif = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_mov_to_gif)
+        fps_slider_gif_to_mov = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_gif_to_mov)
+
+        #bitrate_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=bitrate_adjustment)
+        fps_slider_avi_to_gif = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_avi_to_gif)
+        fps_slider_gif_to_avi = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=fps_adjustment_gif_to_avi)
+
+
+        bitrate_slider.set_digits(0)
+        fps_slider_mp4_to_gif.set_digits(0)
+        fps_slider_gif_to_mp4.set_digits(0)
+
+        fps_slider_webm_to_gif.set_digits(0)
+        fps_slider_gif_to_webm.set_digits(0)
+
+        fps_slider_mov_to_gif.set_digits(0)
+        fps_slider_gif_to_mov.set_digits(0)
+
+        fps_slider_avi_to_gif.set_digits(0)
+        fps_slider_gif_to_avi.set_digits(0)
+
+
+        content_area.pack_start(Gtk.Label(label="GIF to Video Bitrate (kbps):"), False, False, 0)
+        content_area.pack_start(bitrate_slider, False, False, 0)
+
+
+        content_area.pack_start(Gtk.Label(label="Mp4 to GIF FPS:"), False, False, 0)
+        content_area.pack_start(fps_slider_mp4_to_gif, False, False, 0)
+
+        content_area.pack_start(Gtk.Label(label="GIF to Mp4 FPS"), False, False, 0)
+        content_area.pack_start(fps_slider_gif_to_mp4, False, False, 0)
+
+
+        content_area.pack_start(Gtk.Label(label="Webm to GIF FPS:"), False, False, 0)
+        content_area.pack_start(fps_slider_webm_to_gif, False, False, 0)
+
+        content_area.pack_start(Gtk.Label(label="GIF to Webm FPS"), False, False, 0)
+        content_area.pack_start(fps_slider_gif_to_webm, False, False, 0)
+
+
+        content_area.pack_start(Gtk.Label(label="MOV to GIF FPS:"), False, False, 0)
+        content_area.pack_start(fps_slider_mov_to_gif, False, False, 0)
+
+        content_area.pack_start(Gtk.Label(label="GIF to MOV FPS"), False, False, 0)
+        content_area.pack_start(fps_slider_gif_to_mov, False, False, 0)
+
+
+        content_area.pack_start(Gtk.Label(label="AVI to GIF FPS:"), False, False, 0)
+        content_area.pack_start(fps_slider_avi_to_gif, False, False, 0)
+
+        content_area.pack_start(Gtk.Label(label="GIF to AVI FPS"), False, False, 0)
+        content_area.pack_start(fps_slider_gif_to_avi, False, False, 0)
+
+        # Resize policy for GIF outputs
+        max_width_adjustment = Gtk.Adjustment(value=self.max_width, lower=0, upper=3840, step_increment=10)
+        max_width_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=max_width_adjustment)
+        max_width_slider.set_digits(0)
+        content_area.pack_start(Gtk.Label(label="Max GIF width (0 = source width):"), False, False, 0)
+        content_area.pack_start(max_width_slider, False, False, 0)
+
+        upscale_check = Gtk.CheckButton(label="Upscale smaller videos to the max width")
+        upscale_check.set_active(self.allow_upscale)
+        content_area.pack_start(upscale_check, False, False, 0)
+
+        max_size_adjustment = Gtk.Adjustment(value=self.max_output_mb, lower=0, upper=100, step_increment=1)
+        max_size_slider = Gtk.Scale(orientation=Gtk.Orientation.HORIZONTAL, adjustment=max_size_adjustment)
+        max_size_slider.set_digits(0)
+        content_area.pack_start(Gtk.Label(label="Max GIF size in MB (0 = no limit), lowers size/FPS/colours to fit:"), False, False, 0)
+        content_area.pack_start(max_size_slider, False, False, 0)
+
+        vfr_check = Gtk.CheckButton(label="GIF to video: keep the GIF frame timing (FPS sliders are used for AVI or when unchecked)")
+        vfr_check.set_active(self.gif_vfr)
+        content_area.pack_start(vfr_check, False, False, 0)
+
+        # Part of the input to convert, empty means from the beginning / until the end
+        range_hbox = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        content_area.pack_start(range_hbox, False, False, 0)
+
+        start_entry = Gtk.Entry()
+        start_entry.set_placeholder_text("0:00")
+        start_entry.set_text("" if self.start_time is None else str(self.start_time))
+        end_entry = Gtk.Entry()
+        end_entry.set_placeholder_text("end")
+        end_entry.set_text("" if self.end_time is None else str(self.end_time))
+
+        range_hbox.pack_start(Gtk.Label(label="Start (s or mm:ss):"), False, False, 0)
+        range_hbox.pack_start(start_entry, True, True, 0)
+        range_hbox.pack_start(Gtk.Label(label="End:"), False, False, 0)
+        range_hbox.pack_start(end_entry, True, True, 0)
+
+        dialog.show_all()
+
+        response = dialog.run()  # this handles the OK button click
+        if response == Gtk.ResponseType.OK:
+            self.bitrate = int(bitrate_adjustment.get_value())
+            self.mp4_to_gif_fps = int(fps_adjustment_mp4_to_gif.get_value())
+            self.gif_to_mp4_fps = int(fps_adjustment_gif_to_mp4.get_value())
+
+            self.webm_to_gif_fps = int(fps_adjustment_webm_to_gif.get_value())
+            self.gif_to_webm_fps = int(fps_adjustment_gif_to_webm.get_value())
+
+            self.mov_to_gif_fps = int(fps_adjustment_mov_to_gif.get_value())
+            self.gif_to_mov_fps = int(fps_adjustment_gif_to_mov.get_value())
+
+            self.avi_to_gif_fps = int(fps_adjustment_avi_to_gif.get_value())
+            self.gif_to_avi_fps = int(fps_adjustment_gif_to_avi.get_value())
+
+            self.max_width = int(max_width_adjustment.get_value())
+            self.allow_upscale = upscale_check.get_active()
+            self.max_output_mb = int(max_size_adjustment.get_value())
+            self.gif_vfr = vfr_check.get_active()
+
+            try:
+                self.start_time = convert_core.parse_time(start_entry.get_text()) if start_entry.get_text().strip() else None
+                self.end_time = convert_core.parse_time(end_entry.get_text()) if end_entry.get_text().strip() else None
+            except ValueError:
+                self.update_status("Error: Start and end must be seconds or mm:ss.")
+            self.save_settings()
+
+        dialog.destroy()
+
+def run():
+    # Initialize GTK and check if it's available, only now that the window is really wanted
+    if not Gtk.init_check()[0]:
+        print("Failed to initialize GTK.")
+        return 1
+    app = ConverterApp()
+    app.connect("destroy", Gtk.main_quit)
+    app.show_all()
+    Gtk.main()
+    return 0
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import collections
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+import stage_timing
+
+#this is ffmpeg_runner.py, it finds the ffmpeg binaries and runs them with progress reporting and cooperative cancel
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+class ConversionCancelled(Exception):
+    pass
+
+
+class Progress:
+    # One progress report, handed to the progress callback of a conversion
+
+    def __init__(self, frames_done, total_frames=None, encode_fps=0.0, elapsed=0.0):
+        self.frames_done = frames_done
+        self.total_frames = total_frames  # None when the length of the input is unknown
+        self.encode_fps = encode_fps
+        self.elapsed = elapsed
+
+    @property
+    def fraction(self):
+        if not self.total_frames:
+            return None
+        return min(self.frames_done / self.total_frames, 1.0)
+
+    @property
+    def eta_seconds(self):
+        if not self.total_frames or self.encode_fps <= 0:
+            return None
+        return max(self.total_frames - self.frames_done, 0) / self.encode_fps
+
+    def __str__(self):
+        if self.fraction is None:
+            return f"{self.frames_done} frames, {self.encode_fps:.1f} fps"
+        eta = self.eta_seconds
+        eta_text = f", ETA {eta:.0f}s" if eta is not None else ""
+        return f"{self.frames_done}/{self.total_frames} frames ({self.fraction:.0%}), {self.encode_fps:.1f} fps{eta_text}"
+
+
+class CancelToken:
+    # Shared between the thread that wants to stop a conversion and the thread running it
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._processes = set()  # several when a job encodes chunks in parallel
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+        with self._lock:
+            # Kill the encoders right away instead of waiting for their next progress line
+            for process in self._processes:
+                if process.poll() is None:
+                    process.terminate()
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ConversionCancelled("Conversion cancelled.")
+
+    def attach(self, process):
+        with self._lock:
+            self._processes.add(process)
+        if self._event.is_set():
+            self.cancel()
+
+    def detach(self, process):
+        with self._lock:
+            self._processes.discard(process)
+
+
+def ffmpeg_binary():
+    # Same lookup order as moviepy: FFMPEG_BINARY env variable, then the PATH, then the copy shipped with imageio-ffmpeg
+    binary = os.environ.get("FFMPEG_BINARY")
+    if binary and binary != "ffmpeg-imageio" and shutil.which(binary):
+        return shutil.which(binary)
+    binary = shutil.which("ffmpeg")
+    if binary:
+        return binary
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return None
+
+def ffprobe_binary():
+    # imageio-ffmpeg only ships ffmpeg, so ffprobe may legitimately be missing
+    binary = os.environ.get("FFPROBE_BINARY")
+    if binary and shutil.which(binary):
+        return shutil.which(binary)
+    return shutil.which("ffprobe")
+
+def remove_partial_output(path):
+    if path and os.path.exists(path):
+        os.remove(path)
+
+def wait_for(process):
+    # (exit code, peak RSS of the process in MB or None); wait4 gives the rusage of this one child, getrusage only has
+    # the peak of all children of the process' whole lifetime
+    if not hasattr(os, "wait4"):
+        return process.wait(), None
+    try:
+        _, status, rusage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait(), None  # already reaped by a CancelToken's poll()
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return process.returncode, rusage.ru_maxrss / 1024  # ru_maxrss is in KB on Linux
+
+def run_ffmpeg(args, total_frames=None, progress_callback=None, cancel_token=None, partial_output=None):
+    # Runs ffmpeg with -progress on stdout, reports every progress block and removes partial_output on failure or cancel
+    binary = ffmpeg_binary()
+    if binary is None:
+        raise FFmpegError("Error: ffmpeg was not found.")
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+    process = subprocess.Popen([binary, "-hide_banner", "-nostdin", "-loglevel", "error", "-y", "-progress", "pipe:1", "-nostats", *args],
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+
+    # stderr is drained in the background so a chatty ffmpeg can't fill the pipe and stall
+    stderr_tail = collections.deque(maxlen=20)
+    stderr_thread = threading.Thread(target=lambda: stderr_tail.extend(process.stderr), daemon=True)
+    stderr_thread.start()
+
+    if cancel_token is not None:
+        cancel_token.attach(process)
+    start = time.monotonic()
+    block = {}
+    frames_done = 0
+    try:
+        for line in process.stdout:
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key != "progress":
+                continue
+            frames_done = int(block.get("frame", "0") or frames_done)
+            if progress_callback is not None:
+                try:
+                    encode_fps = float(block.get("fps", "0") or 0)
+                except ValueError:
+                    encode_fps = 0.0
+                progress_callback(Progress(frames_done, total_frames, encode_fps, time.monotonic() - start))
+            block = {}
+
+        returncode, peak_rss_mb = wait_for(process)
+        stderr_thread.join()
+        if cancel_token is not None:
+            cancel_token.raise_if_cancelled()
+        if returncode != 0:
+            raise FFmpegError(f"ffmpeg exited with code {returncode}: {''.join(stderr_tail).strip()[-500:]}")
+        stage_timing.add_frames(frames_done)
+        stage_timing.add_peak_rss(peak_rss_mb)
+
+    except BaseException:
+        # Covers errors, cancel and Ctrl+C in a batch worker alike: stop the encoder and never leave a half written file
+        if process.poll() is None:
+            process.kill()
+            process.wait()
+        remove_partial_output(partial_output)
+        raise
+
+    finally:
+        if cancel_token is not None:
+            cancel_token.detach(process)
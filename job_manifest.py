@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+import argparse
+import copy
+import hashlib
+import json
+import os
+import sys
+import time
+
+import batch_convert
+import convert_core
+import settings_profiles
+
+#this is job_manifest.py, it runs a JSON list of inputs with per-item overrides and journals every finished item,
+#so an interrupted or partly failed run continues where it stopped instead of starting from zero
+#usage example: python3 job_manifest.py overnight.json -o ~/gifs -j 8   (run the same command again to resume / retry failures)
+#manifest example, relative paths are relative to the manifest file:
+#  {"profile": "small-gifs", "settings": {"gif_vfr": false},
+#   "items": ["clips/a.mp4",
+#             {"input": "clips/b.gif", "format": "webm", "fps": 12, "start": "0:05", "end": "0:20", "output": "webm"},
+#             {"input": "clips/c.mov", "segments": [["0:01", "0:03"], ["1:00", "1:04"]], "max_width": 480, "max_size_mb": 4}]}
+#per item: output (sub folder of -o), format, fps, start, end, segments, max_width, max_height, max_size_mb
+#and "settings" for any other ConversionSettings attribute
+
+ITEM_KEYS = ["input", "output", "format", "fps", "start", "end", "segments", "max_width", "max_height", "max_size_mb", "settings"]
+
+
+def parse_item_time(value):
+    # Manifests may give times as numbers or as "[hh:]mm:ss" strings
+    return None if value is None else convert_core.parse_time(str(value))
+
+
+def item_settings(base, item):
+    settings = copy.deepcopy(base)
+    settings_profiles.apply_settings(settings, item.get("settings", {}))
+    if "format" in item:
+        settings.selected_format = item["format"]
+    if "fps" in item:
+        # Only the one matching the input's direction is used
+        settings.mp4_to_gif_fps = settings.webm_to_gif_fps = settings.mov_to_gif_fps = settings.avi_to_gif_fps = item["fps"]
+        settings.gif_to_mp4_fps = settings.gif_to_webm_fps = settings.gif_to_mov_fps = settings.gif_to_avi_fps = item["fps"]
+    if "start" in item:
+        settings.start_time = parse_item_time(item["start"])
+    if "end" in item:
+        settings.end_time = parse_item_time(item["end"])
+    if "segments" in item:
+        settings.segments = [(parse_item_time(start), parse_item_time(end)) for start, end in item["segments"]]
+    if "max_width" in item:
+        settings.max_width = item["max_width"] or None
+    if "max_height" in item:
+        settings.max_height = item["max_height"] or None
+    if "max_size_mb" in item:
+        settings.max_output_mb = item["max_size_mb"] or None
+    if settings.selected_format not in convert_core.SUPPORTED_OUTPUT_FORMATS:
+        raise ValueError(f"Error: Unsupported output format '{settings.selected_format}'.")
+    convert_core.selected_ranges(settings)  # bad ranges fail when the manifest is loaded, not hours into the run
+    return settings
+
+
+def read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise ValueError(f"Error: {manifest_path} is not valid JSON ({e}).")
+    if isinstance(data, list):
+        data = {"items": data}  # a bare list of items is a manifest too
+    if not isinstance(data.get("items"), list):
+        raise ValueError(f"Error: {manifest_path} has no list of items.")
+    return data
+
+
+def manifest_jobs(data, manifest_path, output_path, base_settings):
+    # (input_path, output_path, settings) of every item
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for number, item in enumerate(data["items"], 1):
+        if isinstance(item, str):
+            item = {"input": item}
+        unknown = [key for key in item if key not in ITEM_KEYS]
+        if unknown or "input" not in item:
+            raise ValueError(f"Error: Item {number} of the manifest: " +
+                             (f"unknown key(s) {', '.join(unknown)}." if unknown else "no input."))
+        try:
+            settings = item_settings(base_settings, item)
+        except ValueError as e:
+            raise ValueError(f"Error: Item {number} of the manifest: {str(e).removeprefix('Error: ')}")
+        input_path = os.path.join(manifest_dir, os.path.expanduser(item["input"]))
+        jobs.append((input_path, os.path.join(output_path, item.get("output", "")), settings))
+    check_outputs(jobs)
+    return jobs
+
+
+def check_outputs(jobs):
+    # Two items writing the same output file would silently overwrite each other
+    clashes = batch_convert.output_clashes(jobs)
+    if clashes:
+        index, earlier = min(clashes.items())
+        raise ValueError(f"Error: Items {earlier + 1} and {index + 1} of the manifest both write "
+                         f"{batch_convert.job_output_file(*jobs[index])}, give one of them another \"output\" folder.")
+
+
+def job_key(job):
+    # Identifies a job in the journal: the input as it is now and everything that changes its output,
+    # so an edited item or a replaced input file is converted again
+    input_path, output_path, settings = job
+    try:
+        stat = os.stat(input_path)
+        fingerprint = [stat.st_size, stat.st_mtime_ns]
+    except OSError:
+        fingerprint = None
+    payload = json.dumps({"input": os.path.abspath(input_path), "fingerprint": fingerprint, "output": os.path.abspath(output_path),
+                          "settings": settings_profiles.settings_to_dict(settings),
+                          "range": [settings.start_time, settings.end_time, settings.segments]}, sort_keys=True)  # not in a profile
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class Journal:
+    # JSON lines of finished items, each one flushed to disk as it is written so a crash loses at most the items in flight
+
+    def __init__(self, path):
+        self.path = path
+
+    def completed(self):
+        # Keys whose latest entry succeeded and whose output is still there
+        latest = {}
+        line = "\n"
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # the line being written when the run died
+                    latest[record["key"]] = record
+            if not line.endswith("\n"):
+                with open(self.path, "a") as f:
+                    f.write("\n")  # so the next entry doesn't get glued onto that cut off line
+        return {key for key, record in latest.items() if record["ok"] and record.get("output") and os.path.exists(record["output"])}
+
+    def append(self, key, result):
+        record = {"key": key, "input": result.input_path, "output": result.output_file, "ok": result.ok, "error": result.error,
+                  "seconds": round(result.seconds, 3), "finished": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        with open(self.path, "a") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def run_manifest(jobs, journal, workers=None, restart=False, show_progress=False):
+    # Returns (number of items skipped because the journal has them, JobResults of the items that ran)
+    keys = [job_key(job) for job in jobs]
+    completed = set() if restart else journal.completed()
+    pending = [index for index, key in enumerate(keys) if key not in completed]
+
+    def on_result(position, result):
+        journal.append(keys[pending[position]], result)
+        batch_convert.print_result(result)
+
+    results = batch_convert.run_jobs([jobs[index] for index in pending], workers, on_result, show_progress)
+    return len(jobs) - len(pending), results
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Convert the items of a job manifest, resuming where an earlier run stopped.")
+    parser.add_argument("manifest", help="JSON manifest, see the top of job_manifest.py")
+    batch_convert.add_settings_arguments(parser)
+    parser.add_argument("--journal", help="journal of finished items (default: <manifest>.journal)")
+    parser.add_argument("--restart", action="store_true", help="ignore the journal and convert every item again")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    manifest_path = os.path.expanduser(args.manifest)
+    try:
+        data = read_manifest(manifest_path)
+        # Profile (from the command line or the manifest), then the manifest's settings, then the options given here
+        profile = args.profile or data.get("profile")
+        base = settings_profiles.load_profile(profile) if profile else convert_core.ConversionSettings()
+        settings_profiles.apply_settings(base, data.get("settings", {}))
+        settings = batch_convert.settings_from_args(args, base)
+        if args.save_profile:
+            print(f"Profile saved to {settings_profiles.save_profile(args.save_profile, settings)}")
+        jobs = manifest_jobs(data, manifest_path, os.path.expanduser(args.output), settings)
+    except OSError as e:
+        parser.error(f"{manifest_path}: {e.strerror}")
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+
+    journal = Journal(os.path.expanduser(args.journal) if args.journal else manifest_path + ".journal")
+    start = time.monotonic()
+    try:
+        skipped, results = run_manifest(jobs, journal, workers=args.jobs, restart=args.restart, show_progress=args.progress)
+    except KeyboardInterrupt:
+        print(f"Cancelled, run the same command again to continue (journal: {journal.path}).", file=sys.stderr)
+        return 130
+    failed = [result for result in results if not result.ok]
+
+    print(f"{len(results) - len(failed)}/{len(results)} converted in {time.monotonic() - start:.1f}s, {len(failed)} failed, "
+          f"{skipped} already done.")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
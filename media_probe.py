@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+
+from conversion_cache import default_cache_dir
+from ffmpeg_runner import ffmpeg_binary, ffprobe_binary
+from stage_timing import Stage
+
+#this is media_probe.py, it reads duration, size, codec and frame rate of a media file without decoding it,
+#recognizes the container from the first bytes of the file and remembers probe results in a small on-disk index
+
+INDEX_FORMAT_VERSION = 1  # bump when MediaInfo gains or changes fields
+INDEX_MAX_ENTRIES = 5000  # least recently probed files are dropped above this
+QUICKTIME_ATOMS = (b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot")  # old .mov files start without an ftyp box
+# ftyp brands of ISO media files. HEIF/AVIF photos and M4A audio are ISO files just like MP4 video, but have no video to
+# convert; the major brand decides, the compatible brands only when the major brand is none of these
+VIDEO_BRANDS = (b"isom", b"iso2", b"iso3", b"iso4", b"iso5", b"iso6", b"mp41", b"mp42", b"avc1", b"M4V ", b"M4VH", b"M4VP", b"qt  ",
+                b"3gp4", b"3gp5", b"3gp6", b"3g2a", b"mmp4", b"MSNV", b"f4v ", b"XAVC", b"dash")
+NON_VIDEO_BRANDS = (b"M4A ", b"M4B ", b"M4P ", b"F4A ", b"F4B ", b"mif1", b"msf1", b"miaf", b"heic", b"heix", b"heim",
+                    b"heis", b"hevc", b"hevx", b"avif", b"avis")
+
+
+class MediaInfo:
+
+    def __init__(self, duration=None, width=None, height=None, fps=None, rotation=0, codec=None, frames=None, container=None):
+        self.duration = duration  # seconds, None when the container doesn't say
+        self.width = width  # coded size, before rotation
+        self.height = height
+        self.fps = fps
+        self.rotation = rotation  # degrees from the rotate tag / display matrix, ffmpeg applies it on decode
+        self.codec = codec  # e.g. "h264", "vp9", "gif"
+        self.frames = frames  # frames in the whole file, None when the container doesn't say
+        self.container = container  # see detect_format
+
+    @property
+    def display_size(self):
+        # Size of the decoded (autorotated) frames
+        if self.rotation % 180 == 90:
+            return self.height, self.width
+        return self.width, self.height
+
+    def frame_count(self, fps=None):
+        # Number of frames an encode at `fps` (default: the source rate) will produce
+        if fps is None and self.frames:
+            return self.frames
+        fps = fps or self.fps
+        if not self.duration or not fps:
+            return None
+        return max(int(round(self.duration * fps)), 1)
+
+
+def detect_format(path):
+    # Container by content, not by file name: "gif", "avi", "webm", "mov", "mp4" or None when it is none of them
+    try:
+        with open(path, "rb") as f:
+            header = f.read(256)
+    except OSError:
+        return None
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if header[:4] == b"RIFF" and header[8:12] == b"AVI ":
+        return "avi"
+    if header[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm" if b"webm" in header else None  # other Matroska files aren't supported
+    if header[4:8] == b"ftyp":
+        major = header[8:12]
+        if major not in VIDEO_BRANDS:
+            box_end = min(int.from_bytes(header[:4], "big"), len(header))
+            compatible = [header[offset:offset + 4] for offset in range(16, box_end - 3, 4)]
+            if major in NON_VIDEO_BRANDS or any(brand in NON_VIDEO_BRANDS for brand in compatible):
+                return None  # a photo or audio file
+        return "mov" if major == b"qt  " else "mp4"
+    if header[4:8] in QUICKTIME_ATOMS:
+        return "mov"
+    return None
+
+def parse_rate(rate):
+    # ffprobe reports frame rates as fractions like "30000/1001"
+    try:
+        numerator, _, denominator = rate.partition("/")
+        value = float(numerator) / float(denominator or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return value or None
+
+def probe_with_ffprobe(binary, path, count_frames=False):
+    # count_frames counts the packets, which only demuxes the file; cheap for GIFs, whose header has no frame count
+    entries = "format=duration:stream=codec_name,width,height,avg_frame_rate,r_frame_rate,nb_frames"
+    if count_frames:
+        entries += ",nb_read_packets"
+    completed = subprocess.run([binary, "-v", "error", "-select_streams", "v:0", *(["-count_packets"] if count_frames else []),
+                                "-show_entries", entries + ":stream_tags=rotate:stream_side_data=rotation", "-of", "json", path],
+                               capture_output=True, text=True)
+    if completed.returncode != 0:
+        return MediaInfo()
+    data = json.loads(completed.stdout or "{}")
+    stream = (data.get("streams") or [{}])[0]
+    try:
+        duration = float(data.get("format", {}).get("duration"))
+    except (TypeError, ValueError):
+        duration = None
+    fps = parse_rate(stream.get("avg_frame_rate", "")) or parse_rate(stream.get("r_frame_rate", ""))
+    rotation = stream.get("tags", {}).get("rotate")
+    for side_data in stream.get("side_data_list", []):
+        rotation = side_data.get("rotation", rotation)
+    frames = stream.get("nb_read_packets") or stream.get("nb_frames")
+    return MediaInfo(duration, stream.get("width"), stream.get("height"), fps, int(float(rotation or 0)),
+                     stream.get("codec_name"), int(frames) if str(frames or "").isdigit() else None)
+
+def probe_with_ffmpeg(binary, path):
+    # Fallback for installs without ffprobe (e.g. imageio-ffmpeg): parse the banner `ffmpeg -i` prints before failing
+    completed = subprocess.run([binary, "-hide_banner", "-nostdin", "-i", path], capture_output=True, text=True)
+    info = MediaInfo()
+    duration = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", completed.stderr)
+    if duration:
+        hours, minutes, seconds = duration.groups()
+        info.duration = int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+    video = re.search(r"Stream #.*Video: (\w+).*?(\d{2,5})x(\d{2,5})", completed.stderr)
+    if video:
+        info.codec = video.group(1)
+        info.width, info.height = int(video.group(2)), int(video.group(3))
+    fps = re.search(r"(\d+(?:\.\d+)?) (?:fps|tbr)", completed.stderr)
+    if fps:
+        info.fps = float(fps.group(1))
+    rotation = re.search(r"rotate\s*: (-?\d+)", completed.stderr) or re.search(r"rotation of (-?\d+(?:\.\d+)?) degrees", completed.stderr)
+    if rotation:
+        info.rotation = int(float(rotation.group(1)))
+    return info
+
+def probe(path):
+    # Always asks ffprobe/ffmpeg, media_info() is the cached entry point
+    container = detect_format(path)
+    binary = ffprobe_binary()
+    if binary is not None:
+        info = probe_with_ffprobe(binary, path, count_frames=container == "gif")
+    elif ffmpeg_binary() is not None:
+        info = probe_with_ffmpeg(ffmpeg_binary(), path)
+    else:
+        info = MediaInfo()
+    info.container = container
+    return info
+
+
+#### Probe index ####
+
+def default_index_file():
+    return os.path.join(os.path.dirname(default_cache_dir()), "media_index.json")
+
+
+class ProbeIndex:
+    # Probe results keyed by path+size+mtime, kept in memory for the process and optionally in a JSON file,
+    # so a file is probed once however many conversions, size plans and batch runs look at it
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.memory = {}
+        self.loaded_files = set()
+
+    def fingerprint(self, path):
+        stat = os.stat(path)
+        return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+    def read_file(self, index_file):
+        try:
+            with open(index_file) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get("version") != INDEX_FORMAT_VERSION:
+            return {}
+        return data.get("entries", {})
+
+    def write_file(self, index_file, path, size, mtime_ns, info):
+        # Re-read before writing so parallel batch workers add to the index instead of overwriting each other,
+        # a lost entry in a race only means one more probe later
+        entries = self.read_file(index_file)
+        entries.pop(path, None)
+        entries[path] = {"size": size, "mtime_ns": mtime_ns, "info": vars(info)}
+        if len(entries) > INDEX_MAX_ENTRIES:
+            for old_path in list(entries)[:len(entries) - INDEX_MAX_ENTRIES]:
+                del entries[old_path]  # dicts keep insertion order, so the front is the oldest
+        os.makedirs(os.path.dirname(index_file), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(index_file), suffix=".part")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"version": INDEX_FORMAT_VERSION, "entries": entries}, f)
+            os.replace(temp_path, index_file)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def lookup(self, path, index_file=None):
+        key = self.fingerprint(path)
+        with self.lock:
+            if key in self.memory:
+                return self.memory[key]
+            if index_file and index_file not in self.loaded_files:
+                self.loaded_files.add(index_file)
+                with Stage("probe_index"):
+                    entries = self.read_file(index_file)
+                for entry_path, entry in entries.items():
+                    try:
+                        self.memory[(entry_path, entry["size"], entry["mtime_ns"])] = MediaInfo(**entry["info"])
+                    except (KeyError, TypeError):
+                        continue
+                if key in self.memory:
+                    return self.memory[key]
+
+        with Stage("probe"):
+            info = probe(path)
+        with self.lock:
+            self.memory[key] = info
+            if index_file and info.duration is not None:
+                self.write_file(index_file, *key, info)
+        return info
+
+
+PROBE_INDEX = ProbeIndex()
+
+def media_info(path, index_file=None):
+    # Cached probe of path, index_file persists the results between runs (None = only within this process)
+    return PROBE_INDEX.lookup(path, index_file)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+import json
+import os
+import re
+import tempfile
+
+import convert_core
+
+#this is settings_profiles.py, named ConversionSettings stored as JSON files so a tuning can be reused and a bulk run replayed
+#profiles live in ~/.config/videogifconvert/profiles/<name>.json, the GUI keeps its own settings in the "gui" profile
+
+PROFILE_FORMAT_VERSION = 1
+GUI_PROFILE = "gui"
+# Where this machine keeps its cache, index and logs, not part of how a file gets converted
+MACHINE_SETTINGS = ["cache_dir", "cache_max_mb", "cache_content_hash", "media_index", "timing_log"]
+# Which part of one particular file to convert, set per run or per manifest item and never stored in a profile,
+# a range carried over from a profile would silently cut every other file short
+RANGE_SETTINGS = ["start_time", "end_time", "segments"]
+PROFILE_NAME = re.compile(r"^[A-Za-z0-9_.-]+$")
+
+
+def default_profile_dir():
+    base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(base, "videogifconvert", "profiles")
+
+
+def settings_to_dict(settings):
+    return {name: value for name, value in vars(settings).items() if name not in MACHINE_SETTINGS + RANGE_SETTINGS}
+
+
+def apply_settings(settings, values):
+    # Sets the given settings, unknown names are an error so a typo in a profile or manifest doesn't go unnoticed
+    known = vars(convert_core.ConversionSettings())
+    for name, value in values.items():
+        if name not in known or name in MACHINE_SETTINGS:
+            raise ValueError(f"Error: Unknown setting '{name}'.")
+        if name == "segments" and value is not None:
+            value = [tuple(segment) for segment in value]  # JSON has no tuples
+        setattr(settings, name, value)
+    return settings
+
+
+def profile_path(name, profile_dir=None):
+    if not PROFILE_NAME.match(name):
+        raise ValueError(f"Error: '{name}' is not a valid profile name (letters, digits, '.', '_' and '-').")
+    return os.path.join(profile_dir or default_profile_dir(), name + ".json")
+
+
+def save_profile(name, settings, profile_dir=None):
+    path = profile_path(name, profile_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".part")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump({"version": PROFILE_FORMAT_VERSION, "settings": settings_to_dict(settings)}, f, indent=2)
+        os.replace(temp_path, path)  # a crash mid-write never leaves a broken profile behind
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return path
+
+
+def load_profile(name, profile_dir=None, settings=None):
+    # Applies the profile on top of settings (default: a fresh ConversionSettings) and returns them
+    path = profile_path(name, profile_dir)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        raise ValueError(f"Error: There is no profile named '{name}'.")
+    except ValueError:
+        raise ValueError(f"Error: The profile '{name}' is not valid JSON.")
+    values = {name: value for name, value in data.get("settings", {}).items() if name not in RANGE_SETTINGS}  # older profiles saved them
+    return apply_settings(settings or convert_core.ConversionSettings(), values)
+
+
+def list_profiles(profile_dir=None):
+    profile_dir = profile_dir or default_profile_dir()
+    if not os.path.isdir(profile_dir):
+        return []
+    return sorted(name[:-5] for name in os.listdir(profile_dir) if name.endswith(".json"))
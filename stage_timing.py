@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # not on Windows, the records just go without CPU time there
+    resource = None
+
+#this is stage_timing.py, optional timing of the stages of a conversion (probe, size plan, palette, encode, cache ...)
+#every conversion appends one JSON line with its stages to a log file, see batch_convert.py --timings
+#usage example: python3 stage_timing.py timings.jsonl   (summary of a log, e.g. one collected in production)
+#when no recording is active a stage costs one object and one `is None` check
+
+ACTIVE = None  # the StageRecorder of the conversion running in this process, None = timing disabled
+
+
+def cpu_seconds():
+    # CPU time of this process and the ffmpeg children it waited for, so far
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + own.ru_stime + children.ru_utime + children.ru_stime
+
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except (OSError, TypeError):
+        return None
+
+
+class Stage:
+    # with Stage("encode", output=output_file): ... records how long the block took, its CPU time (ffmpeg included),
+    # the frames and the peak RSS of the largest ffmpeg process the encoders inside reported and the size of `output` afterwards
+
+    __slots__ = ("name", "output", "start", "cpu", "frames", "peak_rss_mb")
+
+    def __init__(self, name, output=None):
+        self.name = name
+        self.output = output
+        self.start = None
+        self.frames = 0
+        self.peak_rss_mb = None
+
+    def __enter__(self):
+        if ACTIVE is not None:
+            self.start = time.perf_counter()
+            self.cpu = cpu_seconds()
+            ACTIVE.push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if ACTIVE is not None and self.start is not None:
+            ACTIVE.pop(self, time.perf_counter() - self.start, exc_type is None)
+        return False
+
+
+def add_frames(frames):
+    # Called by the encoders when they finish, the frames count towards the innermost open stage
+    if ACTIVE is not None:
+        ACTIVE.add_frames(frames)
+
+
+def add_peak_rss(peak_rss_mb):
+    # Called by run_ffmpeg with the peak RSS of the ffmpeg process it just reaped
+    if ACTIVE is not None and peak_rss_mb is not None:
+        ACTIVE.add_peak_rss(peak_rss_mb)
+
+
+class StageRecorder:
+    # Stages of one conversion; the chunk threads of a parallel encode report into the same recording
+
+    def __init__(self, input_path):
+        self.input_path = input_path
+        self.lock = threading.Lock()
+        self.open_stages = []
+        self.stages = []
+        self.peak_rss_mb = None  # of the largest ffmpeg process of the whole conversion
+
+    def push(self, timing):
+        with self.lock:
+            self.open_stages.append(timing)
+
+    def pop(self, timing, seconds, ok):
+        cpu = cpu_seconds()
+        entry = {"stage": timing.name, "seconds": round(seconds, 4), "ok": ok}
+        if cpu is not None and timing.cpu is not None:
+            entry["cpu_s"] = round(cpu - timing.cpu, 4)
+        if timing.frames:
+            entry["frames"] = timing.frames
+        if timing.peak_rss_mb is not None:
+            entry["peak_rss_mb"] = round(timing.peak_rss_mb, 1)
+        if timing.output is not None and file_size(timing.output) is not None:
+            entry["bytes_out"] = file_size(timing.output)
+        with self.lock:
+            if timing in self.open_stages:
+                self.open_stages.remove(timing)
+            self.stages.append(entry)
+
+    def add_frames(self, frames):
+        with self.lock:
+            if self.open_stages:
+                self.open_stages[-1].frames += frames
+
+    def add_peak_rss(self, peak_rss_mb):
+        with self.lock:
+            self.peak_rss_mb = max(self.peak_rss_mb or 0.0, peak_rss_mb)
+            if self.open_stages:
+                stage = self.open_stages[-1]
+                stage.peak_rss_mb = max(stage.peak_rss_mb or 0.0, peak_rss_mb)
+
+
+@contextlib.contextmanager
+def record_conversion(log_file, input_path):
+    # with record_conversion(log_file, input_path) as record: times the stages of one conversion, record is None when
+    # log_file is None. The finished record (a dict) is appended to log_file as one JSON line, the caller may add fields
+    global ACTIVE
+    if not log_file:
+        yield None
+        return
+
+    record = {"input": os.path.abspath(input_path), "bytes_in": file_size(input_path),
+              "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "pid": os.getpid()}
+    start = time.perf_counter()
+    start_cpu = cpu_seconds()
+    recorder = ACTIVE = StageRecorder(input_path)
+    try:
+        yield record
+        record["ok"] = True
+    except BaseException as e:
+        record.update(ok=False, error=str(e) or e.__class__.__name__)
+        raise
+    finally:
+        ACTIVE = None
+        cpu = cpu_seconds()
+        record.update(seconds=round(time.perf_counter() - start, 4), stages=recorder.stages)
+        if cpu is not None:
+            record["cpu_s"] = round(cpu - start_cpu, 4)
+        if recorder.peak_rss_mb is not None:
+            # ffmpeg's own, the lifetime peak of a pool worker would carry over from whatever big job it ran before
+            record["peak_rss_mb"] = round(recorder.peak_rss_mb, 1)
+        if record.get("output"):
+            record["bytes_out"] = file_size(record["output"])
+        append_record(log_file, record)
+
+
+def append_record(log_file, record):
+    # One write per line in append mode, so parallel workers never interleave their lines
+    directory = os.path.dirname(log_file)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(log_file, "a") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def read_records(log_file):
+    records = []
+    with open(log_file) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # a line cut off by a crash
+    return records
+
+
+def summarize(records):
+    # Lines of a per-stage table: count, total and mean time, share of the total conversion time, frames per second
+    total_seconds = sum(record.get("seconds", 0.0) for record in records)
+    by_stage = {}
+    for record in records:
+        for entry in record.get("stages", []):
+            totals = by_stage.setdefault(entry["stage"], {"count": 0, "seconds": 0.0, "cpu_s": 0.0, "frames": 0, "peak_rss_mb": None})
+            totals["count"] += 1
+            totals["seconds"] += entry["seconds"]
+            totals["cpu_s"] += entry.get("cpu_s", 0.0)
+            totals["frames"] += entry.get("frames", 0)
+            if entry.get("peak_rss_mb") is not None:
+                totals["peak_rss_mb"] = max(totals["peak_rss_mb"] or 0.0, entry["peak_rss_mb"])
+
+    lines = [f"{'stage':16} {'count':>6} {'total s':>9} {'mean s':>8} {'share':>6} {'cpu s':>9} {'frames/s':>9} {'peak MB':>8}"]
+    for name, totals in sorted(by_stage.items(), key=lambda item: -item[1]["seconds"]):
+        share = totals["seconds"] / total_seconds if total_seconds else 0.0
+        rate = f"{totals['frames'] / totals['seconds']:9.1f}" if totals["frames"] and totals["seconds"] else f"{'':9}"
+        peak = f"{totals['peak_rss_mb']:8.1f}" if totals["peak_rss_mb"] is not None else f"{'':8}"
+        lines.append(f"{name:16} {totals['count']:6d} {totals['seconds']:9.2f} {totals['seconds'] / totals['count']:8.3f} "
+                     f"{share:6.0%} {totals['cpu_s']:9.2f} {rate} {peak}")
+    peak = max((record.get("peak_rss_mb") or 0.0 for record in records), default=0.0)
+    bytes_in = sum(record.get("bytes_in") or 0 for record in records)
+    bytes_out = sum(record.get("bytes_out") or 0 for record in records)
+    lines.append(f"{len(records)} conversions, {total_seconds:.1f}s, {bytes_in / 1024 ** 2:.1f}MB in, "
+                 f"{bytes_out / 1024 ** 2:.1f}MB out, peak ffmpeg RSS {peak:.1f}MB")
+    return lines
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("usage: stage_timing.py <timings.jsonl>", file=sys.stderr)
+        return 2
+    for line in summarize(read_records(argv[0])):
+        print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import batch_convert
+import convert_core
+
+#this is test_batch_convert.py, which jobs of a batch would overwrite each other's output; runs without ffmpeg
+
+MP4_HEADER = b"\0\0\0\x18ftypisom\0\0\0\0isomavc1"
+
+
+def write(path, content):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return str(path)
+
+
+def test_same_name_in_different_folders_clashes(tmp_path):
+    settings = convert_core.ConversionSettings()
+    first = write(tmp_path / "x" / "clip.mp4", MP4_HEADER)
+    second = write(tmp_path / "y" / "clip.mov", MP4_HEADER)
+    other = write(tmp_path / "y" / "other.mp4", MP4_HEADER)
+    out = str(tmp_path / "out")
+    jobs = [(first, out, settings), (other, out, settings), (second, out, settings)]
+    assert batch_convert.output_clashes(jobs) == {2: 0}  # both become out/clip.gif
+
+
+def test_gif_and_video_outputs_differ(tmp_path):
+    # clip.gif -> clip.mp4 and clip.mp4 -> clip.gif write different files
+    settings = convert_core.ConversionSettings()
+    gif = write(tmp_path / "clip.gif", b"GIF89a" + b"\0" * 20)
+    video = write(tmp_path / "clip.mp4", MP4_HEADER)
+    out = str(tmp_path / "out")
+    assert batch_convert.output_clashes([(gif, out, settings), (video, out, settings)]) == {}
+
+
+def test_different_output_folders_never_clash(tmp_path):
+    settings = convert_core.ConversionSettings()
+    first = write(tmp_path / "x" / "clip.mp4", MP4_HEADER)
+    second = write(tmp_path / "y" / "clip.mp4", MP4_HEADER)
+    jobs = [(first, str(tmp_path / "x"), settings), (second, str(tmp_path / "y"), settings)]
+    assert batch_convert.output_clashes(jobs) == {}
+
+
+def test_unconvertible_inputs_are_left_to_fail_on_their_own(tmp_path):
+    settings = convert_core.ConversionSettings()
+    broken = write(tmp_path / "x" / "clip.mp4", b"not a video")
+    good = write(tmp_path / "y" / "clip.mp4", MP4_HEADER)
+    out = str(tmp_path / "out")
+    assert batch_convert.job_output_file(broken, out, settings) is None
+    assert batch_convert.output_clashes([(broken, out, settings), (good, out, settings)]) == {}
@@ -0,0 +1,34 @@
+import pytest
+
+import chunked_encode
+
+#this is test_chunked_encode.py, how an input is cut into time chunks; runs without ffmpeg
+
+
+def test_short_input_stays_one_chunk():
+    assert chunked_encode.plan_chunks(0.0, 30.0, workers=8) == [(0.0, 30.0)]
+
+
+def test_chunk_count_follows_duration_and_workers():
+    assert len(chunked_encode.plan_chunks(0.0, 65.0, workers=8)) == 3  # 65 s only fills 3 chunks of 20 s
+    assert len(chunked_encode.plan_chunks(0.0, 600.0, workers=4)) == 4
+
+
+def test_explicit_chunks_cover_the_range_without_gaps():
+    chunks = chunked_encode.plan_chunks(10.0, 40.0, chunks=3)
+    assert chunks == [(10.0, 20.0), (20.0, 30.0), (30.0, 40.0)]
+
+
+def test_cuts_land_on_whole_frames():
+    frame = 1 / 24
+    chunks = chunked_encode.plan_chunks(0.0, 100.0, chunks=3, frame_duration=frame)
+    assert chunks[0][0] == 0.0 and chunks[-1][1] == 100.0
+    for (_, end), (start, _) in zip(chunks, chunks[1:]):
+        assert end == start
+        assert end / frame == pytest.approx(round(end / frame))
+
+
+def test_more_chunks_than_frames_drops_the_empty_ones():
+    chunks = chunked_encode.plan_chunks(0.0, 0.25, chunks=10, frame_duration=0.1)
+    assert chunks[-1][1] == 0.25
+    assert all(end > start for start, end in chunks)
@@ -0,0 +1,71 @@
+import pytest
+
+import convert_core
+
+#this is test_convert_core.py, the pure helpers that plan a conversion (ranges, size samples, output size); runs without ffmpeg
+
+
+def settings(**values):
+    result = convert_core.ConversionSettings()
+    for name, value in values.items():
+        setattr(result, name, value)
+    return result
+
+
+def test_selected_ranges():
+    assert convert_core.selected_ranges(settings()) == []
+    assert convert_core.selected_ranges(settings(start_time=5)) == [(5.0, None)]
+    assert convert_core.selected_ranges(settings(end_time=7)) == [(0.0, 7.0)]
+    assert convert_core.selected_ranges(settings(start_time=9, segments=[(1, 2), (4, None)])) == [(1.0, 2.0), (4.0, None)]
+
+
+@pytest.mark.parametrize("values", [{"start_time": -1}, {"start_time": 5, "end_time": 5}, {"segments": [(3, 2)]}])
+def test_selected_ranges_rejects_invalid_ranges(values):
+    with pytest.raises(ValueError, match="Invalid time range"):
+        convert_core.selected_ranges(settings(**values))
+
+
+def test_sample_windows_short_input_is_encoded_whole():
+    assert convert_core.sample_windows([], 4.0) == ([(0.0, 4.0)], 4.0)
+
+
+def test_sample_windows_spread_over_the_input():
+    windows, total = convert_core.sample_windows([], 60.0)
+    assert total == 60.0
+    assert windows == [(9.5, 10.5), (29.5, 30.5), (49.5, 50.5)]
+
+
+def test_sample_windows_stay_inside_the_segments():
+    ranges = [(0.0, 10.0), (100.0, 120.0)]
+    windows, total = convert_core.sample_windows(ranges, 200.0)
+    assert total == 30.0
+    assert len(windows) == convert_core.SIZE_SAMPLE_COUNT
+    for start, end in windows:
+        assert any(segment_start <= start < end <= segment_end for segment_start, segment_end in ranges)
+
+
+def test_sample_windows_unknown_duration():
+    assert convert_core.sample_windows([(5.0, None)], None) == ([], None)
+
+
+def test_target_size():
+    assert convert_core.target_size(1920, 1080, settings(max_width=1080)) == (1080, 608)
+    assert convert_core.target_size(640, 480, settings(max_width=1080)) is None  # fits, no upscale by default
+    assert convert_core.target_size(640, 480, settings(max_width=1280, allow_upscale=True)) == (1280, 960)
+    assert convert_core.target_size(1000, 2000, settings(max_width=1080, max_height=500)) == (250, 500)
+    assert convert_core.target_size(1920, 1080, settings(max_width=None)) is None
+    assert convert_core.target_size(None, None, settings()) is None
+
+
+def test_target_size_fits_the_size_budget():
+    frames = 100
+    width, height = convert_core.target_size(1920, 1080, settings(max_width=None, max_output_mb=2), frames)
+    assert width * height * frames * convert_core.GIF_BYTES_PER_PIXEL == pytest.approx(2 * 1024 * 1024, rel=0.01)
+
+
+def test_chunks_for():
+    assert convert_core.chunks_for(settings(chunked=False), [], 120.0) == []
+    assert len(convert_core.chunks_for(settings(chunked=True, chunks=4), [], 120.0, 10)) == 4
+    assert convert_core.chunks_for(settings(chunked=True, chunks=4), [(0.0, 10.0), (50.0, 60.0)], 120.0) == []
+    chunks = convert_core.chunks_for(settings(chunked=True, chunks=2), [(30.0, None)], 90.0)
+    assert chunks == [(30.0, 60.0), (60.0, 90.0)]  # the open end is the end of the input
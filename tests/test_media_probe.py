@@ -0,0 +1,61 @@
+import pytest
+
+import media_probe
+
+#this is test_media_probe.py, container detection by content; runs without ffmpeg
+
+
+def ftyp(major, *compatible):
+    box = major + b"\0\0\0\0" + b"".join(compatible)
+    return (8 + len(box)).to_bytes(4, "big") + b"ftyp" + box + b"\0\0\0\x08free"
+
+
+@pytest.mark.parametrize("header, expected", [
+    (b"GIF89a" + b"\0" * 20, "gif"),
+    (b"GIF87a" + b"\0" * 20, "gif"),
+    (b"RIFF\0\0\0\0AVI LIST", "avi"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42\x82\x84webm", "webm"),
+    (b"\x1a\x45\xdf\xa3\x9f\x42\x82\x88matroska", None),
+    (ftyp(b"isom", b"isom", b"avc1"), "mp4"),
+    (ftyp(b"mp42", b"mp41"), "mp4"),
+    (ftyp(b"qt  ", b"qt  "), "mov"),
+    (ftyp(b"3gp5", b"3gp5", b"isom"), "mp4"),
+    (ftyp(b"XAVC", b"XAVC", b"mp42"), "mp4"),
+    (ftyp(b"zzzz"), "mp4"),  # unknown brand, left for ffmpeg to decide
+    (b"\0\0\0\x08moov", "mov"),
+    (b"not a video at all", None),
+])
+def test_detect_format(tmp_path, header, expected):
+    path = tmp_path / "input.bin"
+    path.write_bytes(header)
+    assert media_probe.detect_format(str(path)) == expected
+
+
+@pytest.mark.parametrize("header", [
+    ftyp(b"M4A ", b"M4A ", b"mp42", b"isom"),  # iTunes audio
+    ftyp(b"heic", b"mif1", b"heic"),  # iPhone photo
+    ftyp(b"avif", b"avif", b"mif1", b"miaf"),
+    ftyp(b"mif1", b"mif1", b"heic"),
+])
+def test_detect_format_rejects_audio_and_images(tmp_path, header):
+    path = tmp_path / "input.mp4"
+    path.write_bytes(header)
+    assert media_probe.detect_format(str(path)) is None
+
+
+def test_video_major_brand_wins_over_image_compatible_brand(tmp_path):
+    # e.g. a camera clip that lists an image brand as compatible is still a video
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(ftyp(b"isom", b"isom", b"mif1"))
+    assert media_probe.detect_format(str(path)) == "mp4"
+
+
+def test_compatible_brands_stop_at_the_box_end(tmp_path):
+    # "heic" right after the ftyp box belongs to the next box, not to the brand list
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(ftyp(b"zzzz", b"zzzz") + b"heic")
+    assert media_probe.detect_format(str(path)) == "mp4"
+
+
+def test_detect_format_missing_file(tmp_path):
+    assert media_probe.detect_format(str(tmp_path / "missing.mp4")) is None
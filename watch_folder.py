@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+import argparse
+import collections
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import signal
+import struct
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import batch_convert
+import convert_core
+
+#this is watch_folder.py, a long running service that converts every file dropped into the watched folders
+#usage example: python3 watch_folder.py ~/drop -o ~/gifs -j 4 --done-dir ~/drop/done
+#the worker processes stay alive between files, so Python and MoviePy are only loaded once per worker
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_IGNORED = 0x00008000  # the watch is gone, e.g. because the folder was deleted
+INOTIFY_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len, followed by the name
+
+
+class PollingWatcher:
+    # Portable fallback: rescans the folders and reports files that are new or changed since the last scan
+
+    def __init__(self, directories, interval=2.0):
+        self.directories = directories
+        self.interval = interval
+        self.snapshot = {}
+        self.last_scan = 0.0
+        self.missing = set()
+
+    def scan(self):
+        found = {}
+        for directory in self.directories:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError as e:
+                # Removed or unmounted, its files show up as new once it is back
+                if directory not in self.missing:
+                    print(f"Warning: can't read {directory} ({e.strerror}), watching for it to come back.", file=sys.stderr, flush=True)
+                    self.missing.add(directory)
+                continue
+            self.missing.discard(directory)
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        found[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                except FileNotFoundError:
+                    continue  # gone between the listing and the stat
+        return found
+
+    def wait(self, timeout):
+        time.sleep(timeout)
+        if time.monotonic() - self.last_scan < self.interval:
+            return set()
+        self.last_scan = time.monotonic()
+        found = self.scan()
+        changed = {path for path, state in found.items() if self.snapshot.get(path) != state}
+        self.snapshot = found
+        return changed
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    # Linux only, reports files as soon as they were closed after writing or moved into a watched folder
+
+    def __init__(self, directories):
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        self.missing = []  # watched folders that were removed, watched again once they are back
+        for directory in directories:
+            if not self.add_watch(directory):
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+
+    def add_watch(self, directory):
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO)
+        if wd < 0:
+            return False
+        self.directories[wd] = directory
+        return True
+
+    def wait(self, timeout):
+        changed = set()
+        for directory in list(self.missing):
+            if self.add_watch(directory):
+                self.missing.remove(directory)
+                try:
+                    changed.update(entry.path for entry in os.scandir(directory) if entry.is_file())  # dropped while it was gone
+                except OSError:
+                    pass
+
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        data = os.read(self.fd, 64 * 1024)
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_IGNORED and wd in self.directories:
+                directory = self.directories.pop(wd)
+                print(f"Warning: {directory} went away, watching for it to come back.", file=sys.stderr, flush=True)
+                self.missing.append(directory)
+            elif wd in self.directories and name:
+                changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+def make_watcher(directories, force_polling=False, interval=2.0):
+    if not force_polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directories)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling.", file=sys.stderr)
+    return PollingWatcher(directories, interval)
+
+
+class Debouncer:
+    # A file is only handed out once its size and mtime stayed the same for `settle` seconds (i.e. nobody writes it anymore)
+
+    def __init__(self, settle=2.0):
+        self.settle = settle
+        self.pending = {}  # path -> ((size, mtime_ns), time of the last change)
+
+    def touch(self, path):
+        self.pending.setdefault(path, (None, time.monotonic()))
+
+    def ready(self):
+        now = time.monotonic()
+        ready = []
+        for path, (state, changed_at) in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != state:
+                self.pending[path] = (current, now)
+            elif now - changed_at >= self.settle:
+                del self.pending[path]
+                ready.append(path)
+        return ready
+
+
+def is_inside(path, directory):
+    # True for directory itself and everything below it
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(directory)]) == os.path.abspath(directory)
+    except ValueError:
+        return False  # different drives on Windows
+
+
+def is_candidate(path, ignored_directories):
+    name = os.path.basename(path)
+    if name.startswith(".") or name.endswith((".part", ".tmp", ".crdownload")):
+        return False  # hidden files and in-progress downloads
+    if any(is_inside(path, directory) for directory in ignored_directories):
+        return False  # our own output / done folders may sit inside a watched folder
+    return convert_core.is_supported_input(path)
+
+
+def move_into(path, directory):
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        shutil.move(path, os.path.join(directory, os.path.basename(path)))
+
+
+def ignore_sigint():
+    # Ctrl+C is handled by the main process as "stop taking new files", the workers finish what they have
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def serve(directories, output_path, settings, workers=None, settle=2.0, max_pending=None, done_dir=None, failed_dir=None,
+          force_polling=False, poll_interval=2.0, show_progress=False, stop=lambda: False):
+    # Runs until stop() returns True, then finishes the jobs already handed to the workers
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 2  # jobs handed to the pool at once, the rest wait in `ready` (backpressure)
+    directories = [os.path.abspath(directory) for directory in directories]
+    ignored = [os.path.abspath(directory) for directory in (output_path, done_dir, failed_dir) if directory]
+    os.makedirs(output_path, exist_ok=True)
+
+    watcher = make_watcher(directories, force_polling, poll_interval)
+    debouncer = Debouncer(settle)
+    ready = collections.deque()
+    queued = set()  # paths that are ready or being converted, so repeated events don't enqueue them twice
+    in_flight = {}  # future -> (input path, output file)
+    # output file -> the input writing it right now, so a second input with the same name fails instead of both writing
+    # the file at once; released when that input is done, a later drop with the same name then replaces the output
+    claimed = {}
+    crashes = collections.Counter()  # input path -> worker crashes it was in flight for
+
+    def finish(path, output_file, result):
+        batch_convert.print_result(result)
+        if claimed.get(output_file) == path:
+            del claimed[output_file]
+        crashes.pop(path, None)
+        try:
+            if os.path.exists(path):
+                move_into(path, done_dir if result.ok else failed_dir)
+        except OSError as e:
+            # e.g. the done folder is on a full or read only disk, the input just stays where it is
+            print(f"Warning: could not move {path} ({e}).", file=sys.stderr, flush=True)
+        queued.discard(path)
+
+    def collect(future):
+        # Hands the result of a finished job on, returns False when the worker running it died (which breaks the pool)
+        path, output_file = in_flight.pop(future)
+        try:
+            result = future.result()
+        except BrokenProcessPool:
+            # One killed worker (e.g. by the OOM killer) fails every job of the pool; a job gets a second try in a new
+            # pool, since most of them were just running next to the one that took the worker down
+            crashes[path] += 1
+            if crashes[path] < 2:
+                ready.appendleft(path)
+                return False
+            finish(path, output_file, batch_convert.JobResult(path, error="Error: The worker process converting it died "
+                                                                          "(out of memory?)."))
+            return False
+        finish(path, output_file, result)
+        return True
+
+    def restart_pool():
+        # A broken pool fails the rest of its jobs right away, collect them and carry on with fresh workers
+        nonlocal pool
+        for future in wait(list(in_flight))[0]:
+            collect(future)
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("Warning: a worker process died, starting new ones.", file=sys.stderr, flush=True)
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=ignore_sigint)
+
+    # Files that were already there when the service started count as dropped now
+    for directory in directories:
+        for entry in os.scandir(directory):
+            if entry.is_file() and is_candidate(entry.path, ignored):
+                debouncer.touch(entry.path)
+
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=ignore_sigint)
+    try:
+        while not stop() or in_flight:
+            if not stop():
+                for path in watcher.wait(0.5 if not in_flight else 0.1):
+                    if path not in queued and is_candidate(path, ignored):
+                        debouncer.touch(path)
+                for path in debouncer.ready():
+                    queued.add(path)
+                    ready.append(path)
+
+            while ready and len(in_flight) < max_pending and not stop():
+                path = ready.popleft()
+                output_file = batch_convert.job_output_file(path, output_path, settings)
+                owner = claimed.setdefault(output_file, path) if output_file else path
+                if owner != path:
+                    finish(path, output_file, batch_convert.JobResult(path, error=f"Error: {owner} already writes the same "
+                                                                                   f"output file {output_file}."))
+                    continue
+                try:
+                    future = pool.submit(batch_convert.convert_job, path, output_path, settings, show_progress)
+                except BrokenProcessPool:
+                    ready.appendleft(path)  # the pool broke since the last look at it
+                    restart_pool()
+                    continue
+                in_flight[future] = path, output_file
+
+            if in_flight:
+                done, _ = wait(list(in_flight), timeout=0.1, return_when=FIRST_COMPLETED)
+                if not all([collect(future) for future in done]):
+                    restart_pool()
+    finally:
+        pool.shutdown()
+        watcher.close()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Watch folders and convert every supported file dropped into them.")
+    parser.add_argument("directories", nargs="+", help="folders to watch")
+    batch_convert.add_settings_arguments(parser)
+    parser.add_argument("--settle", type=float, default=2.0, help="seconds a file must stay unchanged before it is converted")
+    parser.add_argument("--max-pending", type=int, help="jobs handed to the workers at once (default: 2 x jobs)")
+    parser.add_argument("--done-dir", help="move inputs here after a successful conversion")
+    parser.add_argument("--failed-dir", help="move inputs here after a failed conversion")
+    parser.add_argument("--poll", action="store_true", help="poll the folders instead of using inotify")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="seconds between scans when polling")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        settings = batch_convert.settings_from_args(args)
+        convert_core.selected_ranges(settings)
+    except (ValueError, argparse.ArgumentTypeError) as e:
+        parser.error(str(e))
+
+    directories = [os.path.expanduser(directory) for directory in args.directories]
+    for directory in directories:
+        if not os.path.isdir(directory):
+            parser.error(f"{directory} is not a directory")
+        for option, folder in (("-o", args.output), ("--done-dir", args.done_dir), ("--failed-dir", args.failed_dir)):
+            if folder and is_inside(directory, os.path.expanduser(folder)):
+                # Everything in there counts as our own output and would be skipped, so nothing would ever be converted
+                parser.error(f"{directory} is inside the {option} folder, give {option} a folder of its own")
+
+    stopping = []
+    def request_stop(signum, frame):
+        print("Stopping after the running conversions...", file=sys.stderr, flush=True)
+        stopping.append(signum)
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    serve(directories, os.path.expanduser(args.output), settings, workers=args.jobs, settle=args.settle,
+          max_pending=args.max_pending, done_dir=args.done_dir and os.path.expanduser(args.done_dir),
+          failed_dir=args.failed_dir and os.path.expanduser(args.failed_dir), force_polling=args.poll,
+          poll_interval=args.poll_interval, show_progress=args.progress, stop=lambda: bool(stopping))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())